@@ -1,24 +1,52 @@
 import os
+import sys
+import time
 import tempfile
 import json
 import subprocess
 import wave
 import threading
 import math
+import queue
+from contextlib import contextmanager
 import numpy as np
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, request, jsonify, send_file, render_template, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import whisper
-from moviepy import VideoFileClip, AudioFileClip
+from moviepy import VideoFileClip
 import imageio_ffmpeg
 import uuid
+import copy
+import socket
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from config import get_config
+from shared_audio import (
+    SharedPcm, SharedChunk, pcm_to_float32, is_silent,
+    transcribe_shared_chunk, detect_language_shared,
+)
+from inference import (
+    iter_mel_windows, decode_windows, encode_window, model_lock, get_batcher, get_encoder_cache,
+    model_key,
+)
+from backends import get_backend
+from cpu_planner import configure_server, ffmpeg_threads, init_inference_process
+from autotune import apply_saved_settings
+from ingest import IngestRequest, IngestFile, UnsupportedMedia
+from resumable import ResumableUpload, UploadNotFound, OffsetMismatch
+from direct_audio import pcm16k_wav_data, decode_direct, split_wav_frames
+from media_probe import probe_media, has_audio
+from path_ingest import PathNotAllowed, resolve_ingest_path, link_into
+from zip_export import stream_zip, file_blocks
+from job_store import JobStore
 
 # Obtener configuración
 config = get_config()
 
 app = Flask(__name__)
+# Los archivos subidos se escriben una sola vez, directamente en UPLOAD_FOLDER (ver ingest.py)
+app.request_class = IngestRequest
 CORS(app)
 
 # Configuración desde archivo config.py
@@ -28,19 +56,69 @@ app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
 # Crear directorio de uploads si no existe
 os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
 
+# Formato de trabajo de Whisper: 16kHz mono
+PCM_SAMPLE_RATE = 16000
+
 # Estado de trabajos para progreso (job_id -> {status, total_chunks, current_chunk, duration_sec, ...})
 jobs = {}
 jobs_lock = threading.Lock()
 
+# Lotes (/batch): batch_id -> {job_ids, pending (argumentos de los trabajos aún sin lanzar), ...};
+# comparten jobs_lock con jobs
+batches = {}
+
+# Modo producción (JOB_STORE): trabajos y lotes en una base SQLite compartida por los procesos
+# HTTP; los transcriben los procesos de `minutaai worker` (ver job_store.py y run_worker)
+job_store = JobStore(config.JOB_STORE) if config.JOB_STORE else None
+
+# Modelos Whisper ya cargados (nombre -> modelo), para no recargarlos en cada trabajo
+_models = {}
+_models_lock = threading.Lock()
+
+# Procesos de inferencia (INFERENCE_PROCESSES > 0); se crean la primera vez que se usan
+_inference_pool = None
+_inference_pool_lock = threading.Lock()
+
+# Modo de dos pasadas: los refinamientos esperan en una cola y solo avanzan cuando
+# no hay ninguna primera pasada (borrador o transcripción normal) en curso
+_refine_queue = queue.Queue()
+_refine_thread = None
+_first_pass_cond = threading.Condition()
+_first_pass_active = 0
+
+
+_server_ready = False
+
+
+def setup_server():
+    """Preparar este proceso como servidor: ajustes calibrados y reparto de CPU (una sola vez).
+
+    Lo llaman los puntos de entrada (main, run.py, watch_folder.py...), no el import: batch.py y
+    autotune importan app dentro de procesos que ya tienen su propio reparto de CPUs.
+    """
+    global _server_ready
+    if _server_ready:
+        return
+    _server_ready = True
+    # Ajustes calibrados para este equipo (python autotune.py), si los hay
+    tuned = apply_saved_settings()
+    if tuned:
+        print(f"[MinutaAI] Ajustes calibrados para este equipo: {tuned}", flush=True)
+    # Hilos de torch y FFmpeg de este proceso según las CPUs disponibles (ver cpu_planner)
+    configure_server()
+
+
+def get_audio_duration_and_chunks(audio_path, playback_rate=1.0, media=None):
+    """Obtener duración en segundos y número de chunks que se crearán. None si error.
 
-def get_audio_duration_and_chunks(audio_path):
-    """Obtener duración en segundos y número de chunks que se crearán. None si error."""
+    media: MediaInfo del archivo ya sondeado (el del trabajo); si no se pasa, se sondea aquí.
+    """
     try:
-        with AudioFileClip(audio_path) as clip:
-            duration = float(clip.duration)
-        if duration <= 0:
+        media = media or probe_media(audio_path)
+        if media is None or not media.duration or media.duration <= 0:
             return None
-        total_chunks = max(1, math.ceil(duration / config.CHUNK_DURATION))
+        duration = float(media.duration)
+        total_chunks = max(1, math.ceil(duration / (config.CHUNK_DURATION * playback_rate)))
         return (duration, total_chunks)
     except Exception as e:
         print(f"[MinutaAI] Error obteniendo duración: {e}", flush=True)
@@ -69,8 +147,32 @@ def extract_audio_from_video(video_path, output_path):
         print(f"Error extrayendo audio: {e}")
         return False
 
-def split_audio_into_chunks(audio_path, chunk_duration=None):
-    """Dividir audio en chunks usando FFmpeg (el de MoviePy, no depende del PATH)"""
+def atempo_args(playback_rate):
+    """Filtro de FFmpeg que acelera el audio sin cambiar el tono ([] a velocidad normal)."""
+    if not playback_rate or playback_rate == 1.0:
+        return []
+    return ['-af', f'atempo={playback_rate:g}']
+
+
+def chunk_time_range(index, duration_sec, playback_rate=1.0, chunk_duration=None):
+    """(inicio, fin) en segundos del audio original del chunk index.
+
+    Con aceleración cada chunk de chunk_duration segundos cubre chunk_duration * playback_rate
+    segundos reales.
+    """
+    if chunk_duration is None:
+        chunk_duration = config.CHUNK_DURATION
+    span = chunk_duration * playback_rate
+    return round(index * span, 2), round(min((index + 1) * span, duration_sec), 2)
+
+
+def split_audio_into_chunks(audio_path, chunk_duration=None, playback_rate=1.0, duration=None):
+    """Dividir audio en chunks usando FFmpeg (el de MoviePy, no depende del PATH)
+
+    Con playback_rate > 1 cada chunk toma chunk_duration * playback_rate segundos del original
+    y los comprime (atempo) a chunk_duration segundos. duration: la del sondeo del trabajo
+    (si no se pasa, se sondea el archivo).
+    """
     if chunk_duration is None:
         chunk_duration = config.CHUNK_DURATION
 
@@ -82,11 +184,12 @@ def split_audio_into_chunks(audio_path, chunk_duration=None):
     ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
 
     try:
-        # Obtener duración con MoviePy (no requiere ffprobe en el sistema)
-        with AudioFileClip(audio_path) as clip:
-            total_duration = float(clip.duration)
-        print(f"[MinutaAI] Duración del audio: {total_duration:.1f}s", flush=True)
-        if total_duration <= 0:
+        total_duration = duration
+        if total_duration is None:
+            media = probe_media(audio_path)
+            total_duration = media.duration if media else None
+        print(f"[MinutaAI] Duración del audio: {total_duration or 0:.1f}s", flush=True)
+        if not total_duration or total_duration <= 0:
             print("Error: duración del audio es 0")
             return []
 
@@ -95,17 +198,26 @@ def split_audio_into_chunks(audio_path, chunk_duration=None):
         chunk_dir = os.path.join(upload_dir, "chunks_temp")
         os.makedirs(chunk_dir, exist_ok=True)
 
+        # Prefijo único: varios trabajos (o un refinamiento pendiente) comparten chunks_temp
+        prefix = uuid.uuid4().hex[:12]
+        if playback_rate == 1.0:
+            # WAV ya en 16kHz mono: cada chunk se copia del archivo, sin lanzar FFmpeg
+            chunks = split_wav_frames(audio_path, chunk_dir, prefix, chunk_duration)
+            if chunks is not None:
+                return chunks
+
         chunks = []
-        for i in range(0, int(total_duration) + 1, chunk_duration):
-            start_time = i
-            end_time = min(i + chunk_duration, total_duration)
+        span = chunk_duration * playback_rate
+        for i in range(math.ceil(total_duration / span)):
+            start_time = round(i * span, 3)
+            end_time = min(start_time + span, total_duration)
             if start_time >= end_time:
                 break
 
-            chunk_filename = os.path.join(chunk_dir, f"temp_chunk_{len(chunks)}.wav")
+            chunk_filename = os.path.join(chunk_dir, f"{prefix}_chunk_{len(chunks)}.wav")
             ffmpeg_cmd = [
-                ffmpeg_exe, '-i', audio_path, '-ss', str(start_time),
-                '-t', str(end_time - start_time), '-acodec', 'pcm_s16le',
+                ffmpeg_exe, '-threads', str(ffmpeg_threads()), '-i', audio_path, '-ss', str(start_time),
+                '-t', str(end_time - start_time), *atempo_args(playback_rate), '-acodec', 'pcm_s16le',
                 '-ar', '16000', '-ac', '1', '-y', chunk_filename
             ]
             result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=60)
@@ -153,26 +265,205 @@ def _load_wav_as_float32(wav_path):
         return None
 
 
-def transcribe_chunks(chunks, model, progress_callback=None):
-    """Transcribir chunks de audio. progress_callback(current_index_1based, total) opcional."""
-    transcriptions = []
+def decode_to_pcm(audio_path, pcm_path, playback_rate=1.0):
+    """Decodificar el archivo completo a PCM crudo 16kHz mono int16 con una sola llamada a FFmpeg.
+
+    playback_rate > 1 acelera el audio con atempo (mismo tono) antes de dividirlo. El audio que
+    ya está a 16kHz (WAV, y FLAC/OGG con soundfile) se decodifica sin FFmpeg (ver direct_audio).
+    """
+    if playback_rate == 1.0 and decode_direct(audio_path, pcm_path):
+        return True
+    ffmpeg_cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), '-threads', str(ffmpeg_threads()), '-i', os.path.abspath(audio_path), '-vn',
+        *atempo_args(playback_rate), '-f', 's16le', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', '-y', pcm_path
+    ]
+    result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not os.path.exists(pcm_path):
+        err = result.stderr or result.stdout or "unknown"
+        print(f"Error decodificando a PCM: {err[-500:]}")
+        return False
+    return True
+
+
+def split_pcm_into_chunks(pcm_path, chunk_duration=None, offset=0, size=None):
+    """Chunks como vistas int16 de un np.memmap del PCM: no se copian muestras ni se crean WAV.
+
+    El sistema operativo carga y libera las páginas según se leen, así que la memoria
+    residente no crece con la duración de la grabación. offset/size: las muestras están
+    dentro de otro archivo (el bloque 'data' de un WAV 16kHz mono).
+    """
+    if chunk_duration is None:
+        chunk_duration = config.CHUNK_DURATION
+    if size is None:
+        size = os.path.getsize(pcm_path) - offset
+    if size < 2:
+        return []
+    samples = np.memmap(pcm_path, dtype=np.int16, mode='r', offset=offset, shape=(size // 2,))
+    step = int(chunk_duration * PCM_SAMPLE_RATE)
+    return [samples[start:start + step] for start in range(0, samples.size, step)]
+
+
+def _load_chunk_audio(chunk):
+    """Audio float32 de un chunk: ruta a WAV o vista int16 del PCM del trabajo."""
+    if isinstance(chunk, np.ndarray):
+        return pcm_to_float32(chunk)
+    return _load_wav_as_float32(chunk)
+
+
+def _chunk_size_bytes(chunk):
+    """Tamaño del chunk en bytes (None si el WAV no existe)."""
+    if isinstance(chunk, np.ndarray):
+        return chunk.nbytes
+    if not os.path.exists(chunk):
+        return None
+    return os.path.getsize(chunk)
+
+
+def remove_chunk_files(chunks):
+    """Borrar los WAV temporales de una lista de chunks (las vistas PCM no tienen archivo)."""
+    for chunk in chunks:
+        if isinstance(chunk, np.ndarray):
+            continue
+        try:
+            if os.path.exists(chunk):
+                os.remove(chunk)
+        except Exception:
+            pass
+
+
+def normalize_language(value):
+    """Código de idioma de Whisper ('es') a partir de un código o nombre ('Spanish'). ValueError si no existe."""
+    from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+    value = (value or '').strip().lower()
+    if value in LANGUAGES:
+        return value
+    if value in TO_LANGUAGE_CODE:
+        return TO_LANGUAGE_CODE[value]
+    raise ValueError(f"Idioma desconocido: {value}")
+
+
+def english_model_variant(model_name):
+    """Variante solo-inglés ('base' -> 'base.en'); large/turbo no tienen, se devuelve igual."""
+    if model_name.endswith('.en') or _model_rank(model_name) >= _model_rank('large'):
+        return model_name
+    return f"{model_name}.en"
+
+
+def detect_language(chunks, model, max_chunks=None):
+    """Detectar el idioma una vez, con los primeros chunks que tengan audio.
+
+    Se suman las probabilidades de hasta max_chunks chunks (LANGUAGE_DETECT_CHUNKS por
+    defecto) y se devuelve el código más probable, o None si no hubo audio utilizable.
+    """
+    if max_chunks is None:
+        max_chunks = config.LANGUAGE_DETECT_CHUNKS
+    totals = {}
+    used = 0
+    for chunk in chunks:
+        if used >= max_chunks:
+            break
+        size = _chunk_size_bytes(chunk)
+        if size is None or size < 1000:
+            continue
+        audio = _load_chunk_audio(chunk)
+        if audio is None or audio.size == 0 or (config.SILENCE_CHECK and is_silent(audio)):
+            continue
+        try:
+            probs = get_backend().language_probs(model, audio)
+        except Exception as e:
+            _log(f"No se pudo detectar el idioma: {e}")
+            return None
+        for lang, p in probs.items():
+            totals[lang] = totals.get(lang, 0.0) + p
+        used += 1
+    if not totals:
+        return None
+    return max(totals, key=totals.get)
+
+
+def transcribe_chunks(chunks, model, progress_callback=None, chunk_callback=None, keep_files=False,
+                      decode_options=None, language=None, stats=None, backend=None):
+    """Transcribir chunks de audio. progress_callback(current_index_1based, total) opcional.
+
+    Cada chunk es la ruta a un WAV 16kHz mono o una vista int16 del PCM del trabajo.
+
+    chunk_callback(index, text) se llama al terminar cada chunk transcrito sin error.
+    Con keep_files=True no se borran los WAV (se reutilizan en el refinamiento).
+    decode_options: opciones extra de model.transcribe (ver config.get_decoding_options).
+    language: código de idioma ya conocido; evita que Whisper lo detecte de nuevo en cada chunk.
+    stats: dict opcional donde se cuentan 'transcribed_chunks' y 'skipped_chunks' (vacíos o silencio).
+    backend: backend de inferencia del modelo (None = INFERENCE_BACKEND).
+
+    Con BATCHING los chunks con audio se mandan al backend en grupos de BATCH_MAX_SIZE
+    (transcribe_batch), salvo con condition_on_previous_text (ver transcribe_chunks_mel).
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("transcribed_chunks", 0)
+    stats.setdefault("skipped_chunks", 0)
+    if backend is None:
+        backend = get_backend()
+    if decode_options is None:
+        decode_options = config.get_decoding_options()
+    if language:
+        decode_options = dict(decode_options, language=language)
+    batch_size = 1
+    if config.BATCHING and not decode_options.get("condition_on_previous_text"):
+        batch_size = max(1, config.BATCH_MAX_SIZE)
     total = len(chunks)
+    transcriptions = [""] * total
+    batch = []  # (índice, chunk, audio) pendientes de pasar al backend
+    
+    def remove_chunk(chunk):
+        if not keep_files:
+            remove_chunk_files([chunk])
     
-    for i, chunk_path in enumerate(chunks):
-        chunk_path = os.path.abspath(chunk_path)
+    def finish(i, chunk, text):
+        transcriptions[i] = text
+        if chunk_callback:
+            try:
+                chunk_callback(i, text)
+            except Exception:
+                pass
+        remove_chunk(chunk)
+    
+    def fail(i, chunk, e):
+        import traceback
+        err_msg = f"ERROR en chunk {i}: {type(e).__name__}: {e}"
+        _log(err_msg)
+        _log_error_to_file(err_msg, e)
+        traceback.print_exc()
+        transcriptions[i] = f"[Error en chunk {i}]"
+        remove_chunk(chunk)
+    
+    def flush():
+        items = list(batch)
+        batch.clear()
         try:
-            if not os.path.exists(chunk_path):
-                _log(f"Chunk {i} no existe: {chunk_path}")
-                transcriptions.append("")
+            if len(items) == 1:
+                texts = [backend.transcribe_window(model, items[0][2], decode_options)]
+            else:
+                texts = backend.transcribe_batch(model, [audio for _, _, audio in items], decode_options)
+        except Exception as e:
+            for i, chunk, _ in items:
+                fail(i, chunk, e)
+            return
+        for (i, chunk, _), text in zip(items, texts):
+            stats["transcribed_chunks"] += 1
+            finish(i, chunk, text)
+    
+    for i, chunk in enumerate(chunks):
+        if not isinstance(chunk, np.ndarray):
+            chunk = os.path.abspath(chunk)
+        try:
+            size = _chunk_size_bytes(chunk)
+            if size is None:
+                _log(f"Chunk {i} no existe: {chunk}")
                 continue
-            size = os.path.getsize(chunk_path)
             if size < 1000:
                 _log(f"Chunk {i} muy pequeño ({size} bytes), omitiendo")
-                transcriptions.append("")
-                try:
-                    os.remove(chunk_path)
-                except Exception:
-                    pass
+                stats["skipped_chunks"] += 1
+                remove_chunk(chunk)
                 continue
 
             _log(f"Transcribiendo fragmento {i+1}/{len(chunks)}...")
@@ -181,48 +472,459 @@ def transcribe_chunks(chunks, model, progress_callback=None):
                     progress_callback(i + 1, total)
                 except Exception:
                     pass
-            # Cargar WAV con Python (no usa ffmpeg en PATH; los chunks ya son 16kHz mono)
-            audio = _load_wav_as_float32(chunk_path)
+            # Cargar con Python (no usa ffmpeg en PATH; los chunks ya son 16kHz mono)
+            audio = _load_chunk_audio(chunk)
             if audio is None or audio.size == 0:
-                transcriptions.append("")
+                finish(i, chunk, "")
+            elif config.SILENCE_CHECK and is_silent(audio):
+                _log(f"Chunk {i} en silencio, omitiendo")
+                stats["skipped_chunks"] += 1
+                finish(i, chunk, "")
             else:
-                result = model.transcribe(audio, fp16=False)
-                transcriptions.append((result.get("text") or "").strip())
-            
-            try:
-                os.remove(chunk_path)
-            except Exception:
-                pass
+                batch.append((i, chunk, audio))
+                if len(batch) >= batch_size:
+                    flush()
             
         except Exception as e:
-            import traceback
+            fail(i, chunk, e)
+    if batch:
+        flush()
+    
+    return transcriptions
+
+def transcribe_chunks_mel(chunks, model, progress_callback=None, chunk_callback=None, keep_files=False,
+                          decode_options=None, language=None, stats=None, model_name=None):
+    """Como transcribe_chunks, pero con el log-mel calculado por bloques (una STFT por bloque)
+    y cada chunk decodificado como una ventana de 30 s ya alineada. Chunks de 30 s como máximo.
+
+    Con BATCHING las ventanas van al WindowBatcher del modelo (compartido con otros trabajos)
+    y se mantienen hasta BATCH_MAX_SIZE en vuelo; los resultados se recogen en orden. Con
+    condition_on_previous_text (perfil accurate) cada ventana necesita el texto de la anterior
+    como prompt, así que se decodifican de una en una aunque BATCHING esté activo.
+    Con ENCODER_CACHE (y model_name) la salida del encoder de cada ventana se guarda en disco
+    por hash del audio y modelo; si ya estaba, solo se ejecuta el decodificador.
+    """
+    if decode_options is None:
+        decode_options = config.get_decoding_options()
+    if stats is None:
+        stats = {}
+    stats.setdefault("transcribed_chunks", 0)
+    stats.setdefault("skipped_chunks", 0)
+    cache = get_encoder_cache() if config.ENCODER_CACHE and model_name else None
+    if cache:
+        stats.setdefault("encoder_cache_hits", 0)
+    batcher = get_batcher(model) if config.BATCHING and not decode_options.get("condition_on_previous_text") else None
+    in_flight = config.BATCH_MAX_SIZE if batcher else 0
+    transcriptions = []
+    total = len(chunks)
+    pending = deque()  # (índice, Future con el texto; None = vacío o silencio)
+    prompt = None
+
+    def finish_oldest():
+        nonlocal prompt
+        i, future = pending.popleft()
+        try:
+            if future is None:
+                text = ""
+                stats["skipped_chunks"] += 1
+            else:
+                text = future.result()
+                stats["transcribed_chunks"] += 1
+            prompt = text or None
+            transcriptions.append(text)
+            if chunk_callback:
+                try:
+                    chunk_callback(i, text)
+                except Exception:
+                    pass
+        except Exception as e:
             err_msg = f"ERROR en chunk {i}: {type(e).__name__}: {e}"
             _log(err_msg)
             _log_error_to_file(err_msg, e)
-            traceback.print_exc()
             transcriptions.append(f"[Error en chunk {i}]")
+        if not keep_files:
+            remove_chunk_files([chunks[i]])
+
+    for i, mel, digest in iter_mel_windows(chunks, _load_chunk_audio, model.dims.n_mels,
+                                           device=model.device, digest=cache is not None):
+        if progress_callback:
             try:
-                if os.path.exists(chunk_path):
-                    os.remove(chunk_path)
+                progress_callback(i + 1, total)
             except Exception:
                 pass
-    
+        if mel is not None and cache:
+            # A partir de aquí "mel" es la salida del encoder (model.decode ya no lo ejecuta)
+            features = cache.get(model_key(model_name), digest, model.device)
+            if features is None:
+                with model_lock(model):
+                    features = encode_window(model, mel)
+                cache.put(model_key(model_name), digest, features)
+            else:
+                stats["encoder_cache_hits"] += 1
+            mel = features
+        if mel is None:
+            pending.append((i, None))
+        elif batcher:
+            pending.append((i, batcher.submit(mel, decode_options, language)))
+        else:
+            _log(f"Transcribiendo fragmento {i+1}/{total}...")
+            future = Future()
+            try:
+                with model_lock(model):
+                    future.set_result(decode_windows(model, mel.unsqueeze(0), decode_options, language, prompt)[0])
+            except Exception as e:
+                future.set_exception(e)
+            pending.append((i, future))
+        while len(pending) > in_flight:
+            finish_oldest()
+    while pending:
+        finish_oldest()
+    return transcriptions
+
+
+def _get_inference_pool():
+    """Pool de procesos de inferencia ('spawn': no hereda hilos ni el estado de torch del servidor)."""
+    global _inference_pool
+    with _inference_pool_lock:
+        if _inference_pool is None:
+            # Cada proceso toma su parte de las CPUs (hilos de torch y afinidad, ver cpu_planner)
+            context = multiprocessing.get_context('spawn')
+            _inference_pool = ProcessPoolExecutor(
+                max_workers=config.INFERENCE_PROCESSES,
+                mp_context=context,
+                initializer=init_inference_process,
+                initargs=(context.Value('i', 0), config.INFERENCE_PROCESSES),
+            )
+        return _inference_pool
+
+
+def transcribe_chunks_in_workers(chunks, model_name, progress_callback=None, chunk_callback=None,
+                                 decode_options=None, language=None, stats=None, **_):
+    """Como transcribe_chunks, pero en los procesos de inferencia con chunks SharedChunk.
+
+    A cada proceso solo viaja la referencia (bloque, inicio, fin); el audio se lee de la
+    memoria compartida. Se mantienen como mucho INFERENCE_PROCESSES chunks en vuelo y
+    progress_callback se llama antes de enviar cada uno (el refinamiento espera ahí).
+    """
+    if decode_options is None:
+        decode_options = config.get_decoding_options()
+    if language:
+        decode_options = dict(decode_options, language=language)
+    if stats is None:
+        stats = {}
+    stats.setdefault("transcribed_chunks", 0)
+    stats.setdefault("skipped_chunks", 0)
+    pool = _get_inference_pool()
+    transcriptions = [""] * len(chunks)
+    pending = {}
+    next_index = 0
+    while next_index < len(chunks) or pending:
+        while next_index < len(chunks) and len(pending) < config.INFERENCE_PROCESSES:
+            if progress_callback:
+                try:
+                    progress_callback(next_index + 1, len(chunks))
+                except Exception:
+                    pass
+            _log(f"Transcribiendo fragmento {next_index+1}/{len(chunks)}...")
+            future = pool.submit(transcribe_shared_chunk, chunks[next_index], model_name, decode_options)
+            pending[future] = next_index
+            next_index += 1
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            i = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                err_msg = f"ERROR en chunk {i}: {type(e).__name__}: {e}"
+                _log(err_msg)
+                _log_error_to_file(err_msg, e)
+                transcriptions[i] = f"[Error en chunk {i}]"
+                continue
+            transcriptions[i] = result["text"]
+            stats["skipped_chunks" if result["skipped"] else "transcribed_chunks"] += 1
+            if chunk_callback:
+                try:
+                    chunk_callback(i, result["text"])
+                except Exception:
+                    pass
     return transcriptions
 
+
+def _transcribe(chunks, model_name, **kwargs):
+    """Transcribir en este proceso o, si los chunks están en memoria compartida, en los procesos de inferencia."""
+    if chunks and isinstance(chunks[0], SharedChunk):
+        return transcribe_chunks_in_workers(chunks, model_name, **kwargs)
+    if config.MEL_PIPELINE and config.CHUNK_DURATION <= 30 and get_backend().supports_mel:
+        return transcribe_chunks_mel(chunks, get_whisper_model(model_name), model_name=model_name, **kwargs)
+    return transcribe_chunks(chunks, get_whisper_model(model_name), **kwargs)
+
+
+def _detect_language(chunks, model_name):
+    """detect_language en este proceso o en un proceso de inferencia (chunks SharedChunk)."""
+    if not (chunks and isinstance(chunks[0], SharedChunk)):
+        return detect_language(chunks, get_whisper_model(model_name))
+    future = _get_inference_pool().submit(
+        detect_language_shared, chunks, model_name, config.LANGUAGE_DETECT_CHUNKS)
+    try:
+        totals = future.result()
+    except Exception as e:
+        _log(f"No se pudo detectar el idioma: {e}")
+        return None
+    return max(totals, key=totals.get) if totals else None
+
+
 def _log(msg):
     """Imprimir en consola para que veas el progreso (ventana del .bat)"""
     print(f"[MinutaAI] {msg}", flush=True)
 
+
+def get_whisper_model(model_name, precision=None, backend=None):
+    """Cargar un modelo Whisper una sola vez (por backend y precisión) y reutilizarlo entre trabajos."""
+    precision = precision or config.INFERENCE_PRECISION
+    backend = backend or get_backend()
+    key = (backend.name, model_name, precision)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            _log(f"Cargando modelo Whisper '{model_name}' ({backend.name}, {precision}, solo la primera vez tarda)...")
+            model = backend.load(model_name, precision)
+            _models[key] = model
+        return model
+
+
+def _model_rank(model_name):
+    """Posición del modelo en WHISPER_MODEL_ORDER ('small.en' -> 'small'). Desconocido = el mayor."""
+    base = model_name.split('.')[0].split('-')[0]
+    order = config.WHISPER_MODEL_ORDER
+    return order.index(base) if base in order else len(order)
+
+
+def _queue_depth(exclude_job_id=None):
+    """Número de trabajos en curso (sin contar exclude_job_id ni los de un lote que aún esperan turno)."""
+    if job_store is not None:
+        return job_store.active_count(exclude_job_id)
+    with jobs_lock:
+        return sum(
+            1 for jid, j in jobs.items()
+            if jid != exclude_job_id and j.get("status") == "processing" and j.get("step") != "queued"
+        )
+
+
+def choose_whisper_model(queue_depth, duration_sec, base_model=None):
+    """Elegir el modelo para un trabajo según la cola y la duración del audio.
+
+    Sin ADAPTIVE_MODEL devuelve siempre el modelo configurado. Con carga solo baja
+    de modelo (nunca sube por encima de WHISPER_MODEL) y conserva el sufijo '.en'.
+    """
+    base_model = base_model or config.WHISPER_MODEL
+    if not config.ADAPTIVE_MODEL:
+        return base_model
+    caps = [m for n, m in config.ADAPTIVE_QUEUE_THRESHOLDS if queue_depth >= n]
+    if queue_depth > 0:
+        caps += [m for s, m in config.ADAPTIVE_DURATION_THRESHOLDS if duration_sec >= s]
+    if not caps:
+        return base_model
+    cap = min(caps, key=_model_rank)
+    if _model_rank(cap) >= _model_rank(base_model):
+        return base_model
+    if base_model.endswith('.en') and _model_rank(cap) < _model_rank('large'):
+        return f"{cap}.en"
+    return cap
+
+
+@contextmanager
+def _first_pass():
+    """Marcar una primera pasada en curso; los refinamientos esperan mientras dure."""
+    global _first_pass_active
+    with _first_pass_cond:
+        _first_pass_active += 1
+    try:
+        yield
+    finally:
+        with _first_pass_cond:
+            _first_pass_active -= 1
+            _first_pass_cond.notify_all()
+
+
+def _wait_for_first_pass_idle():
+    """Bloquear hasta que no haya primeras pasadas en curso (prioridad baja del refinamiento)."""
+    with _first_pass_cond:
+        while _first_pass_active > 0:
+            _first_pass_cond.wait()
+
+
+def _refine_worker():
+    """Hilo único que procesa los refinamientos en orden de llegada."""
+    while True:
+        item = _refine_queue.get()
+        try:
+            _refine_job(*item)
+        except Exception as e:
+            import traceback
+            _log(f"ERROR en refinamiento: {e}")
+            traceback.print_exc()
+            with jobs_lock:
+                job = jobs.get(item[0])
+                if job:
+                    job["status"] = "error"
+                    job["error"] = str(e)
+        finally:
+            _refine_queue.task_done()
+
+
+def _enqueue_refinement(job_id, chunks, draft_transcriptions, finish):
+    """Encolar la segunda pasada de un trabajo y arrancar el hilo de refinamiento si hace falta."""
+    global _refine_thread
+    _refine_queue.put((job_id, chunks, draft_transcriptions, finish))
+    with _first_pass_cond:
+        if _refine_thread is None or not _refine_thread.is_alive():
+            _refine_thread = threading.Thread(target=_refine_worker, daemon=True)
+            _refine_thread.start()
+
+
+def _refine_job(job_id, chunks, draft_transcriptions, finish):
+    """Segunda pasada: retranscribir con el modelo grande y sustituir el borrador chunk a chunk."""
+    with jobs_lock:
+        job = jobs.get(job_id)
+    if not job:
+        return
+    transcriptions = list(draft_transcriptions)
+    try:
+        _log(f"Refinando {len(chunks)} fragmentos con '{job['model']}'...")
+
+        def on_refine_start(current, total):
+            _wait_for_first_pass_idle()
+
+        def on_refined_chunk(index, text):
+            transcriptions[index] = text
+            with jobs_lock:
+                job["chunks"][index].update({"text": text, "pass": "final"})
+                job["refined_chunks"] += 1
+                job["transcription"] = ' '.join(transcriptions)
+
+        _transcribe(chunks, job["model"], progress_callback=on_refine_start,
+                    chunk_callback=on_refined_chunk,
+                    decode_options=config.get_decoding_options(job["profile"]),
+                    language=job.get("language"))
+    except Exception as e:
+        err_msg = f"ERROR en refinamiento (se conserva el borrador): {type(e).__name__}: {e}"
+        _log(err_msg)
+        _log_error_to_file(err_msg, e)
+    finally:
+        remove_chunk_files(chunks)
+    finish(transcriptions)
+
+
+def _write_transcription(unique_id, transcriptions):
+    """Guardar la transcripción unida en el TXT del trabajo. Devuelve (texto, nombre del TXT)."""
+    full_transcription = ' '.join(transcriptions)
+    txt_filename = f"{unique_id}_transcription.txt"
+    txt_path = os.path.join(app.config['UPLOAD_FOLDER'], txt_filename)
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write(full_transcription)
+    return full_transcription, txt_filename
+
+
 def _run_transcription_job(job_id, file_path, audio_path, file_type, file_extension, unique_id):
     """Ejecutar en segundo plano: dividir, transcribir y actualizar job."""
     with jobs_lock:
         job = jobs.get(job_id)
     if not job:
         return
+
+    chunks = []
+    pcm_path = None
+    shared = None
+
+    def release_pcm():
+        # Soltar las vistas del memmap antes de borrar el PCM (en Windows no se puede borrar abierto)
+        chunks.clear()
+        if shared is not None:
+            shared.release()
+        if pcm_path and os.path.exists(pcm_path):
+            try:
+                os.remove(pcm_path)
+            except Exception:
+                pass
+
+    def remove_link():
+        # Ingesta por ruta: se borra el enlace de UPLOAD_FOLDER; el original no se toca
+        if job.get("linked_source") and os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    def finish(transcriptions):
+        full_transcription, txt_filename = _write_transcription(unique_id, transcriptions)
+        if job.get("output_path"):
+            # Ingesta por ruta / carpeta vigilada: el TXT también junto al original (o donde se pida)
+            try:
+                with open(job["output_path"], 'w', encoding='utf-8') as f:
+                    f.write(full_transcription)
+            except OSError as e:
+                _log(f"No se pudo escribir {job['output_path']}: {e}")
+        release_pcm()
+        if config.CLEANUP_TEMP_FILES and file_type == 'video' and os.path.exists(audio_path):
+            try:
+                os.remove(audio_path)
+            except Exception:
+                pass
+        remove_link()
+        with jobs_lock:
+            job["status"] = "done"
+            job["transcription"] = full_transcription
+            job["txt_file"] = txt_filename
+            job["chunks_processed"] = len(transcriptions)
+        _log("Transcripción terminada.")
+
     try:
-        _log("Dividiendo audio en fragmentos...")
-        chunks = split_audio_into_chunks(audio_path)
+        if file_type == 'video' and not os.path.exists(audio_path):
+            # Modo producción: el proceso HTTP solo sondeó el video; el audio se extrae aquí.
+            # Se escribe con otro nombre y se renombra al terminar, así un trabajo que vuelve a
+            # la cola tras caerse su worker no encuentra un WAV a medias.
+            _log("Es video: extrayendo audio (puede tardar)...")
+            partial_path = f"{os.path.splitext(audio_path)[0]}.partial.wav"
+            if not extract_audio_from_video(file_path, partial_path):
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                remove_link()
+                with jobs_lock:
+                    job["status"] = "error"
+                    job["error"] = "Error extracting audio from video"
+                return
+            os.replace(partial_path, audio_path)
+            _log("Audio extraído.")
+        wav_data = pcm16k_wav_data(audio_path) if config.PCM_MMAP and job["playback_rate"] == 1.0 else None
+        if wav_data:
+            # Ya en 16kHz mono: las muestras se leen del propio WAV, sin decodificar ni copiarlas a un PCM
+            _log("Audio ya en 16kHz mono: fragmentos directamente del WAV")
+            if config.INFERENCE_PROCESSES > 0:
+                shared = SharedPcm.from_file(audio_path, *wav_data)
+                chunks.extend(shared.chunks(config.CHUNK_DURATION, PCM_SAMPLE_RATE))
+            else:
+                chunks.extend(split_pcm_into_chunks(audio_path, offset=wav_data[0], size=wav_data[1]))
+        elif config.PCM_MMAP:
+            _log("Decodificando audio a PCM (una sola pasada)...")
+            pcm_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}.pcm")
+            if not decode_to_pcm(audio_path, pcm_path, job["playback_rate"]):
+                release_pcm()
+                pcm_path = None
+            elif config.INFERENCE_PROCESSES > 0:
+                # El audio pasa una vez a memoria compartida; los procesos leen sus rangos de ahí
+                shared = SharedPcm.from_file(pcm_path)
+                chunks.extend(shared.chunks(config.CHUNK_DURATION, PCM_SAMPLE_RATE))
+                os.remove(pcm_path)
+                pcm_path = None
+            else:
+                chunks.extend(split_pcm_into_chunks(pcm_path))
+        if not wav_data and pcm_path is None and shared is None:
+            _log("Dividiendo audio en fragmentos...")
+            chunks.extend(split_audio_into_chunks(audio_path, playback_rate=job["playback_rate"],
+                                                  duration=job["media"]["duration"]))
         if not chunks:
+            release_pcm()
+            remove_link()
             with jobs_lock:
                 job["status"] = "error"
                 job["error"] = "Error processing audio file"
@@ -230,42 +932,347 @@ def _run_transcription_job(job_id, file_path, audio_path, file_type, file_extens
         with jobs_lock:
             job["total_chunks"] = len(chunks)
             job["step"] = "transcribing"
+            # Marcas de tiempo del audio original (con aceleración, cada chunk cubre más segundos)
+            job["chunks"] = []
+            for i in range(len(chunks)):
+                start, end = chunk_time_range(i, job["duration_sec"], job["playback_rate"])
+                job["chunks"].append({"text": "", "pass": "pending", "start": start, "end": end})
         _log(f"Fragmentos creados: {len(chunks)}")
-        _log("Cargando modelo Whisper (solo la primera vez tarda)...")
-        model = whisper.load_model(config.WHISPER_MODEL)
-        _log("Modelo cargado. Transcribiendo...")
+        # Los trabajos de un lote usan el modelo elegido para todo el lote (sigue cargado entre archivos)
+        model_name = job.get("batch_model") or choose_whisper_model(_queue_depth(job_id), job.get("duration_sec", 0))
+        if model_name != config.WHISPER_MODEL:
+            _log(f"Carga alta: usando modelo '{model_name}' en lugar de '{config.WHISPER_MODEL}'")
+        draft_model_name = None
+        if job.get("two_pass") and _model_rank(config.DRAFT_WHISPER_MODEL) < _model_rank(model_name):
+            draft_model_name = config.DRAFT_WHISPER_MODEL
+
+        # Idioma una sola vez por trabajo: pista del usuario, modelo solo-inglés o detección
+        # con el modelo más pequeño que se vaya a usar
+        language = job.get("language")
+        language_source = "hint" if language else None
+        if not language and (draft_model_name or model_name).endswith('.en'):
+            language, language_source = "en", "model"
+        if not language:
+            language = _detect_language(chunks, draft_model_name or model_name)
+            language_source = "detected" if language else None
+            if language:
+                _log(f"Idioma detectado: {language}")
+        if language == "en" and config.ENGLISH_MODEL_ROUTING:
+            model_name = english_model_variant(model_name)
+            if draft_model_name:
+                draft_model_name = english_model_variant(draft_model_name)
+
+        with jobs_lock:
+            job["model"] = model_name
+            job["draft_model"] = draft_model_name
+            job["language"] = language
+            job["language_source"] = language_source
+        _log("Transcribiendo...")
 
         def on_chunk_done(current, total):
             with jobs_lock:
                 job["current_chunk"] = current
                 job["total_chunks"] = total
 
-        transcriptions = transcribe_chunks(chunks, model, progress_callback=on_chunk_done)
-        full_transcription = ' '.join(transcriptions)
-        txt_filename = f"{unique_id}_transcription.txt"
-        txt_path = os.path.join(app.config['UPLOAD_FOLDER'], txt_filename)
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(full_transcription)
-        if config.CLEANUP_TEMP_FILES and file_type == 'video' and os.path.exists(audio_path):
-            try:
-                os.remove(audio_path)
-            except Exception:
-                pass
+        def on_chunk_text(index, text):
+            with jobs_lock:
+                job["chunks"][index].update({"text": text, "pass": "draft" if draft_model_name else "final"})
+
+        with _first_pass():
+            # El borrador usa DRAFT_DECODING_PROFILE; el perfil del trabajo queda para el refinamiento
+            transcriptions = _transcribe(
+                chunks, draft_model_name or model_name, progress_callback=on_chunk_done,
+                chunk_callback=on_chunk_text, keep_files=bool(draft_model_name), stats=job["stats"],
+                decode_options=config.get_decoding_options(
+                    config.DRAFT_DECODING_PROFILE if draft_model_name else job["profile"]),
+                language=language,
+            )
+        if not draft_model_name:
+            finish(transcriptions)
+            return
+
+        # Borrador listo: se publica ya y el refinamiento sigue en segundo plano
+        draft_transcription, txt_filename = _write_transcription(unique_id, transcriptions)
         with jobs_lock:
-            job["status"] = "done"
-            job["transcription"] = full_transcription
+            job["step"] = "refining"
+            job["draft_transcription"] = draft_transcription
+            job["transcription"] = draft_transcription
             job["txt_file"] = txt_filename
-            job["chunks_processed"] = len(chunks)
-        _log("Transcripción terminada.")
+        _log("Borrador listo. Refinamiento en cola.")
+        _enqueue_refinement(job_id, chunks, transcriptions, finish)
     except Exception as e:
         import traceback
         _log(f"ERROR: {e}")
         traceback.print_exc()
+        remove_chunk_files(chunks)
+        release_pcm()
+        remove_link()
         with jobs_lock:
             job["status"] = "error"
             job["error"] = str(e)
 
 
+def _form_flag(name, default, form=None):
+    """Leer un campo booleano del formulario ('1', 'true', 'on'...); default si no viene."""
+    value = (request.form if form is None else form).get(name)
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _job_options(form):
+    """Opciones del trabajo (velocidad, perfil, idioma, dos pasadas) desde un formulario o JSON.
+
+    Devuelve (opciones, None) o (None, respuesta 400).
+    """
+    try:
+        playback_rate = float(form.get('playback_rate') or config.PLAYBACK_RATE)
+    except (TypeError, ValueError):
+        playback_rate = 0.0
+    if not 1.0 <= playback_rate <= config.MAX_PLAYBACK_RATE:
+        return None, (jsonify({'error': f'playback_rate must be between 1.0 and {config.MAX_PLAYBACK_RATE}'}), 400)
+    
+    profile = form.get('profile') or config.DEFAULT_DECODING_PROFILE
+    if profile not in config.DECODING_PROFILES:
+        return None, (jsonify({'error': f'Unknown decoding profile: {profile}'}), 400)
+    
+    language = form.get('language') or config.WHISPER_LANGUAGE
+    if language:
+        try:
+            language = normalize_language(language)
+        except ValueError:
+            return None, (jsonify({'error': f'Unknown language: {language}'}), 400)
+    
+    return {
+        "playback_rate": playback_rate,
+        "profile": profile,
+        "language": language,
+        "two_pass": _form_flag('two_pass', config.TWO_PASS, form),
+    }, None
+
+
+class JobRejected(Exception):
+    """El archivo no se puede transcribir; status: código HTTP para el cliente."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _create_job(file_path, filename, unique_id, options, content_hash=None, keep_source=False,
+                output_path=None, batch_id=None, linked=False):
+    """Crear el trabajo de un archivo y lanzarlo en segundo plano. JobRejected si no se puede.
+
+    file_path suele estar en UPLOAD_FOLDER; con keep_source es el original de otra carpeta
+    (ingesta por ruta) y no se borra nunca. linked: file_path es un enlace al original (ingesta
+    por ruta) y se borra al terminar el trabajo. output_path: copia adicional del TXT final.
+    batch_id: el trabajo queda en cola (step 'queued') y lo lanza el hilo del lote.
+    Devuelve job_id, total_chunks, duration_sec y sha256.
+    """
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    file_type = get_file_type(filename)
+    audio_path = file_path
+    
+    def discard():
+        for path in {file_path, audio_path}:
+            if os.path.exists(path) and not (keep_source and path == file_path):
+                os.remove(path)
+    
+    # Un solo sondeo por trabajo: duración, códec y pistas; las etapas siguientes lo reutilizan
+    media = probe_media(file_path)
+    if media is None or not has_audio(media):
+        discard()
+        raise JobRejected('No se pudo leer el archivo' if media is None else 'El archivo no tiene pista de audio')
+    _log(f"Sondeo ({media.method}, {media.probe_ms} ms): {media.container}, {media.codec}, "
+         f"{media.sample_rate} Hz, {media.channels} canales")
+    
+    if file_type == 'video':
+        audio_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}.wav")
+        # Modo producción: la extracción va con el trabajo y la hace el worker, no el proceso HTTP
+        if job_store is None:
+            _log("Es video: extrayendo audio (puede tardar)...")
+            if not extract_audio_from_video(file_path, audio_path):
+                discard()
+                raise JobRejected('Error extracting audio from video', 500)
+            _log("Audio extraído.")
+    
+    info = get_audio_duration_and_chunks(audio_path, options["playback_rate"], media=media)
+    if not info:
+        discard()
+        raise JobRejected('No se pudo obtener la duración del audio (archivo vacío o dañado)')
+    duration_sec, total_chunks = info
+    _log(f"Duración: {duration_sec:.1f}s → {total_chunks} fragmentos")
+    
+    job_id = str(uuid.uuid4())
+    job = {
+        "status": "processing",
+        "step": "queued" if batch_id or job_store is not None else "splitting",
+        "filename": filename,
+        "batch_id": batch_id,
+        "total_chunks": total_chunks,
+        "current_chunk": 0,
+        "duration_sec": round(duration_sec, 1),
+        "transcription": None,
+        "txt_file": None,
+        "error": None,
+        "chunks_processed": 0,
+        "model": None,
+        "two_pass": options["two_pass"],
+        "profile": options["profile"],
+        "language": options["language"],
+        "language_source": None,
+        "playback_rate": options["playback_rate"],
+        "sha256": content_hash,
+        "output_path": output_path,
+        "linked_source": linked,
+        "draft_model": None,
+        "draft_transcription": None,
+        "refined_chunks": 0,
+        "chunks": [],
+        "media": {
+            "duration": media.duration, "container": media.container, "codec": media.codec,
+            "sample_rate": media.sample_rate, "channels": media.channels, "streams": media.streams,
+        },
+        "stats": {"transcribed_chunks": 0, "skipped_chunks": 0, "probe_ms": media.probe_ms,
+                  "probe_method": media.method},
+    }
+    run_args = (job_id, file_path, audio_path, file_type, file_extension, unique_id)
+    if job_store is not None:
+        # Modo producción: lo toma un proceso `minutaai worker` (los de un lote, al liberarlo)
+        job_store.add_job(job_id, job, run_args, held=bool(batch_id))
+    else:
+        with jobs_lock:
+            jobs[job_id] = job
+    if batch_id:
+        with jobs_lock:
+            batches[batch_id]["job_ids"].append(job_id)
+            if job_store is None:
+                batches[batch_id]["pending"][job_id] = run_args
+    elif job_store is None:
+        threading.Thread(target=_run_transcription_job, args=run_args, daemon=True).start()
+    
+    return {
+        "job_id": job_id,
+        "total_chunks": total_chunks,
+        "duration_sec": round(duration_sec, 1),
+        "sha256": content_hash,
+    }
+
+
+def _wait_until_decoded(job):
+    """Esperar a que el trabajo termine de decodificar y dividir su audio (o termine)."""
+    while True:
+        with jobs_lock:
+            if job["status"] != "processing" or job["step"] not in ("queued", "splitting"):
+                return
+        time.sleep(0.2)
+
+
+def _run_batch(batch_id):
+    """Hilo de un lote: sus trabajos en orden de llegada y todos con el mismo modelo.
+
+    El siguiente archivo se decodifica mientras el anterior se transcribe (como mucho dos a la
+    vez), así el modelo y los procesos de inferencia no se quedan parados entre archivos.
+    """
+    with jobs_lock:
+        batch = batches[batch_id]
+        job_ids = list(batch["job_ids"])
+        longest = max((jobs[job_id]["duration_sec"] for job_id in job_ids), default=0)
+    model_name = choose_whisper_model(_queue_depth(), longest)
+    with jobs_lock:
+        batch["model"] = model_name
+    _log(f"Lote {batch_id}: {len(job_ids)} archivos con el modelo '{model_name}'")
+    running = []
+    for job_id in job_ids:
+        while len(running) >= 2:
+            running.pop(0)[1].join()
+        if running:
+            _wait_until_decoded(running[-1][0])
+        with jobs_lock:
+            job = jobs[job_id]
+            run_args = batch["pending"].pop(job_id)
+            job["batch_model"] = model_name
+            job["step"] = "splitting"
+        thread = threading.Thread(target=_run_transcription_job, args=run_args, daemon=True)
+        thread.start()
+        running.append((job, thread))
+    for _, thread in running:
+        thread.join()
+    _log(f"Lote {batch_id} terminado")
+
+
+def _release_batch(batch_id):
+    """Modo producción: elegir el modelo del lote y pasar sus trabajos a la cola compartida.
+
+    Los workers los toman en orden de llegada; con más de un trabajo por worker (WORKER_JOBS) o
+    varios workers, el siguiente archivo se decodifica mientras el anterior se transcribe.
+    """
+    with jobs_lock:
+        batch = batches.pop(batch_id)
+    batch.pop("pending")
+    members = job_store.get_jobs(batch["job_ids"]).values()
+    batch["model"] = choose_whisper_model(_queue_depth(), max((j["duration_sec"] for j in members), default=0))
+    job_store.add_batch(batch_id, batch)
+    job_store.release_batch(batch_id, batch["model"])
+    _log(f"Lote {batch_id}: {len(batch['job_ids'])} archivos en cola con el modelo '{batch['model']}'")
+
+
+def get_job(job_id):
+    """Copia del estado del trabajo (de JOB_STORE en modo producción), o None si no existe."""
+    if job_store is not None:
+        return job_store.get_job(job_id)
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def get_jobs(job_ids):
+    """[(job_id, copia del estado)] de los trabajos de job_ids que existen, en el mismo orden."""
+    if job_store is not None:
+        found = job_store.get_jobs(job_ids)
+    else:
+        with jobs_lock:
+            found = {job_id: dict(jobs[job_id]) for job_id in job_ids if job_id in jobs}
+    return [(job_id, found[job_id]) for job_id in job_ids if job_id in found]
+
+
+def _get_batch(batch_id):
+    """Copia del resumen del lote (job_ids, rejected, model), o None si no existe."""
+    with jobs_lock:
+        batch = batches.get(batch_id)
+        if batch:
+            return dict(batch, job_ids=list(batch["job_ids"]), rejected=list(batch["rejected"]))
+    return job_store.get_batch(batch_id) if job_store is not None else None
+
+
+def _start_job(file_path, filename, unique_id, options, content_hash=None):
+    """_create_job para un archivo subido: respuesta para el cliente (o error con su código)."""
+    try:
+        return jsonify(_create_job(file_path, filename, unique_id, options, content_hash))
+    except JobRejected as e:
+        return jsonify({'error': str(e)}), e.status
+
+
+def submit_path(path, options, output_path=None, roots=None, batch_id=None):
+    """Crear un trabajo para un archivo que ya está en el servidor, sin copiarlo a UPLOAD_FOLDER.
+
+    PathNotAllowed si la ruta no está dentro de roots (INGEST_ROOTS por defecto); JobRejected
+    si el archivo no se puede transcribir. Devuelve lo mismo que _create_job.
+    """
+    real_path = resolve_ingest_path(path, roots)
+    filename = os.path.basename(real_path)
+    unique_id = str(uuid.uuid4())
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}.{file_extension}")
+    mode = link_into(real_path, file_path)
+    _log(f"Ingesta por ruta: {real_path} ({mode or 'en su sitio'})")
+    return _create_job(file_path if mode else real_path, filename, unique_id, options,
+                       keep_source=mode is None, output_path=output_path, batch_id=batch_id,
+                       linked=mode is not None)
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Subir archivo, calcular chunks y devolver job_id para consultar progreso."""
@@ -281,58 +1288,234 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': 'File type not allowed'}), 400
         
+        if getattr(file.stream, 'rejected', None):
+            # Rechazado con la cabecera: el resto del cuerpo no se llegó a guardar
+            raise UnsupportedMedia(file.stream.rejected)
+        
+        options, error = _job_options(request.form)
+        if error:
+            return error
+        
         filename = secure_filename(file.filename)
         _log(f"Archivo: {filename}")
         unique_id = str(uuid.uuid4())
-        job_id = str(uuid.uuid4())
         file_extension = filename.rsplit('.', 1)[1].lower()
         unique_filename = f"{unique_id}.{file_extension}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         
-        _log("Guardando archivo en disco...")
-        file.save(file_path)
+        if isinstance(file.stream, IngestFile):
+            # Ya está en UPLOAD_FOLDER (escrito mientras llegaba): solo se renombra
+            file.stream.save_as(file_path)
+            content_hash = file.stream.sha256
+        else:
+            _log("Guardando archivo en disco...")
+            file.save(file_path)
+            content_hash = None
         _log(f"Guardado en: {file_path}")
         
-        file_type = get_file_type(filename)
-        audio_path = file_path
-        if file_type == 'video':
-            _log("Es video: extrayendo audio (puede tardar)...")
-            audio_path = file_path.replace(file_extension, 'wav')
-            if not extract_audio_from_video(file_path, audio_path):
-                return jsonify({'error': 'Error extracting audio from video'}), 500
-            _log("Audio extraído.")
+        return _start_job(file_path, filename, unique_id, options, content_hash)
         
-        info = get_audio_duration_and_chunks(audio_path)
-        if not info:
-            return jsonify({'error': 'No se pudo obtener la duración del audio'}), 500
-        duration_sec, total_chunks = info
-        _log(f"Duración: {duration_sec:.1f}s → {total_chunks} fragmentos")
+    except UnsupportedMedia as e:
+        # Rechazado con la cabecera: el resto del cuerpo no se llegó a guardar
+        _log(f"Archivo rechazado: {e}")
+        return jsonify({'error': str(e)}), 415
+    except Exception as e:
+        import traceback
+        _log(f"ERROR: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+
+@app.route('/upload/resumable', methods=['POST'])
+def create_resumable_upload():
+    """Crear una subida reanudable: JSON (o formulario) con filename, size y las opciones del trabajo."""
+    data = request.get_json(silent=True) or request.form
+    filename = secure_filename(str(data.get('filename') or ''))
+    if not allowed_file(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+    if size <= 0:
+        return jsonify({'error': 'size must be a positive number of bytes'}), 400
+    if size > config.MAX_CONTENT_LENGTH:
+        return jsonify({'error': 'File too large'}), 413
+    options, error = _job_options(data)
+    if error:
+        return error
+    upload = ResumableUpload.create(filename, size, options)
+    _log(f"Subida reanudable {upload.id}: {filename} ({size} bytes)")
+    return jsonify({
+        "upload_id": upload.id,
+        "offset": 0,
+        "size": size,
+        "chunk_size": config.RESUMABLE_CHUNK_SIZE,
+    }), 201
+
+
+@app.route('/upload/resumable/<upload_id>', methods=['GET', 'PATCH', 'DELETE'])
+def resumable_upload(upload_id):
+    """GET: offset recibido. PATCH: añadir el cuerpo en Upload-Offset. DELETE: cancelar."""
+    try:
+        upload = ResumableUpload.load(upload_id)
+    except UploadNotFound:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    if request.method == 'DELETE':
+        upload.cancel()
+        return '', 204
+    
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return jsonify({'error': 'Upload-Offset header required'}), 400
+        try:
+            upload.append(request.stream, offset)
+        except UploadNotFound:
+            return jsonify({'error': 'Upload not found'}), 404
+        except OffsetMismatch as e:
+            return jsonify({'error': str(e), 'offset': e.offset}), 409
+        except UnsupportedMedia as e:
+            _log(f"Subida reanudable {upload.id} rechazada: {e}")
+            upload.cancel()
+            return jsonify({'error': str(e)}), 415
+    
+    response = jsonify({"upload_id": upload.id, "offset": upload.offset, "size": upload.size})
+    response.headers['Upload-Offset'] = str(upload.offset)
+    response.headers['Upload-Length'] = str(upload.size)
+    return response
+
+
+@app.route('/upload/resumable/<upload_id>/finalize', methods=['POST'])
+def finalize_resumable_upload(upload_id):
+    """Convertir una subida reanudable completa en un trabajo (misma respuesta que /upload)."""
+    try:
+        upload = ResumableUpload.load(upload_id)
+    except UploadNotFound:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload.offset != upload.size:
+        return jsonify({'error': 'Upload incomplete', 'offset': upload.offset, 'size': upload.size}), 409
+    try:
+        unique_id = str(uuid.uuid4())
+        file_extension = upload.filename.rsplit('.', 1)[1].lower()
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}.{file_extension}")
+        try:
+            content_hash = upload.finalize(file_path)
+        except UploadNotFound:
+            # Otra petición (quizá en otro proceso) la finalizó o la canceló antes
+            return jsonify({'error': 'Upload not found'}), 404
+        except UnsupportedMedia as e:
+            upload.cancel()
+            return jsonify({'error': str(e)}), 415
+        _log(f"Subida reanudable {upload.id} completa: {file_path}")
+        return _start_job(file_path, upload.filename, unique_id, upload.options, content_hash)
+    except Exception as e:
+        import traceback
+        _log(f"ERROR: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+
+@app.route('/upload/path', methods=['POST'])
+def upload_path():
+    """Transcribir un archivo que ya está en el servidor (dentro de INGEST_ROOTS), sin subirlo.
+
+    JSON (o formulario) con path y las opciones de /upload; misma respuesta que /upload.
+    """
+    data = request.get_json(silent=True) or request.form
+    options, error = _job_options(data)
+    if error:
+        return error
+    try:
+        return jsonify(submit_path(str(data.get('path') or ''), options))
+    except PathNotAllowed as e:
+        return jsonify({'error': str(e)}), e.status
+    except JobRejected as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        import traceback
+        _log(f"ERROR: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+
+@app.route('/batch', methods=['POST'])
+def create_batch():
+    """Varios archivos en un solo lote: campo files (multipart, repetido) y/o paths (rutas del servidor).
+
+    Las opciones de /upload valen para todos los archivos. Los trabajos se procesan juntos y en
+    orden (ver _run_batch). Devuelve batch_id, los trabajos creados y los archivos rechazados.
+    """
+    batch_id = None
+    try:
+        data = request.get_json(silent=True) or request.form
+        options, error = _job_options(data)
+        if error:
+            return error
+        files = [f for f in request.files.getlist('files') if f.filename]
+        paths = data.getlist('paths') if hasattr(data, 'getlist') else data.get('paths') or []
+        if isinstance(paths, str):
+            paths = [paths]
+        if not files and not paths:
+            return jsonify({'error': 'No files provided'}), 400
+        if len(files) + len(paths) > config.MAX_BATCH_FILES:
+            return jsonify({'error': f'Too many files (max {config.MAX_BATCH_FILES})'}), 400
         
+        batch_id = str(uuid.uuid4())
         with jobs_lock:
-            jobs[job_id] = {
-                "status": "processing",
-                "step": "splitting",
-                "total_chunks": total_chunks,
-                "current_chunk": 0,
-                "duration_sec": round(duration_sec, 1),
-                "transcription": None,
-                "txt_file": None,
-                "error": None,
-                "chunks_processed": 0,
-            }
-        thread = threading.Thread(
-            target=_run_transcription_job,
-            args=(job_id, file_path, audio_path, file_type, file_extension, unique_id),
-            daemon=True,
-        )
-        thread.start()
+            batches[batch_id] = {"job_ids": [], "pending": {}, "rejected": [], "model": None,
+                                 "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+        created = []
+        rejected = []
+        for file in files:
+            if not allowed_file(file.filename):
+                rejected.append({'file': file.filename, 'error': 'File type not allowed'})
+                continue
+            if getattr(file.stream, 'rejected', None):
+                rejected.append({'file': file.filename, 'error': file.stream.rejected})
+                continue
+            filename = secure_filename(file.filename)
+            unique_id = str(uuid.uuid4())
+            file_extension = filename.rsplit('.', 1)[1].lower()
+            file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}.{file_extension}")
+            if isinstance(file.stream, IngestFile):
+                file.stream.save_as(file_path)
+                content_hash = file.stream.sha256
+            else:
+                file.save(file_path)
+                content_hash = None
+            try:
+                created.append(_create_job(file_path, filename, unique_id, options, content_hash,
+                                           batch_id=batch_id))
+            except JobRejected as e:
+                rejected.append({'file': file.filename, 'error': str(e)})
+        for path in paths:
+            try:
+                created.append(submit_path(str(path), options, batch_id=batch_id))
+            except (PathNotAllowed, JobRejected) as e:
+                rejected.append({'path': path, 'error': str(e)})
         
+        if not created:
+            with jobs_lock:
+                batches.pop(batch_id, None)
+            return jsonify({'error': 'Ningún archivo del lote se puede transcribir', 'rejected': rejected}), 400
+        with jobs_lock:
+            batches[batch_id]["rejected"] = rejected
+        if job_store is not None:
+            _release_batch(batch_id)
+        else:
+            threading.Thread(target=_run_batch, args=(batch_id,), daemon=True).start()
+        _log(f"Lote {batch_id}: {len(created)} trabajos, {len(rejected)} rechazados")
         return jsonify({
-            "job_id": job_id,
-            "total_chunks": total_chunks,
-            "duration_sec": round(duration_sec, 1),
+            "batch_id": batch_id,
+            "jobs": created,
+            "rejected": rejected,
+            "total_chunks": sum(j["total_chunks"] for j in created),
+            "duration_sec": round(sum(j["duration_sec"] for j in created), 1),
         })
-        
+    
     except Exception as e:
         import traceback
         _log(f"ERROR: {e}")
@@ -340,11 +1523,57 @@ def upload_file():
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+@app.route('/batch/<batch_id>')
+def batch_status(batch_id):
+    """Estado agregado del lote: trabajos por estado, avance total en chunks y el resumen de cada archivo."""
+    batch = _get_batch(batch_id)
+    if not batch:
+        return jsonify({'error': 'Batch not found'}), 404
+    members = get_jobs(batch["job_ids"])
+    rejected = batch["rejected"]
+    model = batch["model"]
+    counts = {"queued": 0, "processing": 0, "done": 0, "error": 0}
+    total_chunks = current_chunk = 0
+    summary = []
+    for job_id, job in members:
+        state = "queued" if job["status"] == "processing" and job["step"] == "queued" else job["status"]
+        counts[state] += 1
+        total_chunks += job.get("total_chunks", 0)
+        current_chunk += job.get("total_chunks", 0) if state == "done" else job.get("current_chunk", 0)
+        summary.append({
+            "job_id": job_id,
+            "filename": job.get("filename"),
+            "status": state,
+            "step": job.get("step", ""),
+            "current_chunk": job.get("current_chunk", 0),
+            "total_chunks": job.get("total_chunks", 0),
+            "duration_sec": job.get("duration_sec", 0),
+            "txt_file": job.get("txt_file") if state == "done" else None,
+            "error": job.get("error"),
+        })
+    if counts["queued"] or counts["processing"]:
+        status = "processing"
+    else:
+        status = "done" if counts["done"] else "error"
+    return jsonify({
+        "batch_id": batch_id,
+        "status": status,
+        "model": model,
+        "total_jobs": len(members),
+        **counts,
+        "total_chunks": total_chunks,
+        "current_chunk": current_chunk,
+        "progress": round(current_chunk / total_chunks, 3) if total_chunks else 0,
+        "duration_sec": round(sum(job.get("duration_sec", 0) for _, job in members), 1),
+        "jobs": summary,
+        "rejected": rejected,
+    })
+
+
 @app.route('/upload/status/<job_id>')
 def upload_status(job_id):
     """Estado del trabajo: total_chunks, current_chunk, status, transcription (si done)."""
-    with jobs_lock:
-        job = jobs.get(job_id)
+    job = get_job(job_id)
     if not job:
         return jsonify({'error': 'Job not found'}), 404
     out = {
@@ -353,11 +1582,27 @@ def upload_status(job_id):
         "total_chunks": job.get("total_chunks", 0),
         "current_chunk": job.get("current_chunk", 0),
         "duration_sec": job.get("duration_sec", 0),
+        "model": job.get("model"),
+        "profile": job.get("profile"),
+        "language": job.get("language"),
+        "playback_rate": job.get("playback_rate", 1.0),
+        "media": job.get("media"),
+        "stats": dict(job.get("stats", {})),
     }
+    if job.get("draft_model"):
+        # Modo de dos pasadas: borrador, texto actual (borrador + refinado) y avance por chunk
+        out["draft_model"] = job["draft_model"]
+        out["draft_transcription"] = job.get("draft_transcription")
+        out["transcription"] = job.get("transcription")
+        out["txt_file"] = job.get("txt_file")
+        out["refined_chunks"] = job.get("refined_chunks", 0)
+        out["chunks"] = list(job.get("chunks", []))
     if job["status"] == "done":
         out["transcription"] = job.get("transcription", "")
         out["txt_file"] = job.get("txt_file", "")
         out["chunks_processed"] = job.get("chunks_processed", 0)
+        # Texto de cada chunk con inicio/fin en segundos del audio original
+        out["chunks"] = list(job.get("chunks", []))
     if job["status"] == "error":
         out["error"] = job.get("error", "Unknown error")
     return jsonify(out)
@@ -374,6 +1619,68 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'error': f'File not found: {str(e)}'}), 404
 
+def _export_entries(selected, formats):
+    """Entradas del ZIP de exportación: TXT y/o JSON de cada trabajo, leídos de uno en uno."""
+    used = set()
+    for job_id in selected:
+        job = get_job(job_id)
+        if not job or job["status"] != "done":
+            continue
+        stem = os.path.splitext(secure_filename(job.get("filename") or "") or job_id)[0] or job_id
+        if stem in used:
+            stem = f"{stem}_{job_id[:8]}"
+        used.add(stem)
+        if "txt" in formats:
+            txt_path = os.path.join(app.config['UPLOAD_FOLDER'], job.get("txt_file") or "")
+            if job.get("txt_file") and os.path.exists(txt_path):
+                yield f"{stem}.txt", file_blocks(txt_path)
+            else:
+                yield f"{stem}.txt", [job.get("transcription", "").encode("utf-8")]
+        if "json" in formats:
+            structured = {
+                "job_id": job_id,
+                "filename": job.get("filename"),
+                "language": job.get("language"),
+                "model": job.get("model"),
+                "profile": job.get("profile"),
+                "duration_sec": job.get("duration_sec", 0),
+                "transcription": job.get("transcription", ""),
+                "chunks": list(job.get("chunks", [])),
+            }
+            yield f"{stem}.json", [json.dumps(structured, ensure_ascii=False, indent=2).encode("utf-8")]
+
+
+@app.route('/download/zip', methods=['GET', 'POST'])
+def download_zip():
+    """ZIP con las transcripciones de varios trabajos, generado mientras se envía.
+
+    Selección: batch_id y/o job_ids (lista JSON o separados por comas). format: txt, json o
+    both (por defecto). Solo entran los trabajos terminados.
+    """
+    data = request.get_json(silent=True) or request.values
+    job_ids = data.get("job_ids") or []
+    if isinstance(job_ids, str):
+        job_ids = [j.strip() for j in job_ids.split(",") if j.strip()]
+    formats = {"both": ("txt", "json"), "txt": ("txt",), "json": ("json",)}.get(data.get("format") or "both")
+    if formats is None:
+        return jsonify({'error': 'format must be txt, json or both'}), 400
+    batch_id = data.get("batch_id")
+    if batch_id:
+        batch = _get_batch(batch_id)
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+        job_ids = batch["job_ids"] + list(job_ids)
+    selected = [job_id for job_id, job in get_jobs(list(dict.fromkeys(job_ids))) if job["status"] == "done"]
+    if not selected:
+        return jsonify({'error': 'No finished jobs to export'}), 404
+    download_name = f"minutaai_{batch_id or 'transcripciones'}.zip"
+    return Response(
+        stream_with_context(stream_zip(_export_entries(selected, formats))),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{download_name}"'},
+    )
+
+
 @app.route('/')
 def index():
     """Página principal"""
@@ -389,9 +1696,131 @@ def health_check():
     """Endpoint de salud del servidor"""
     return jsonify({'status': 'healthy', 'message': 'Server is running'})
 
-if __name__ == '__main__':
+def run_worker(max_jobs=None):
+    """Proceso de transcripción del modo producción: toma trabajos de JOB_STORE y los ejecuta.
+
+    Hasta max_jobs (WORKER_JOBS) trabajos a la vez, cada uno con el pipeline de siempre en su
+    hilo. Cada WORKER_POLL_INTERVAL segundos se guarda el estado de los que cambiaron; aparte, un
+    latido (sin reescribir el estado) con el que otro worker detecta uno caído (WORKER_STALE_SECONDS).
+    """
+    if job_store is None:
+        raise RuntimeError("JOB_STORE no está configurado")
+    max_jobs = max_jobs or config.WORKER_JOBS
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"🛠️  Worker {worker}: hasta {max_jobs} trabajos a la vez (Ctrl+C para detener)", flush=True)
+    active = []
+    written = {}
+    last_stale_check = last_heartbeat = 0
+    while True:
+        if time.monotonic() - last_stale_check > config.WORKER_STALE_SECONDS / 4:
+            last_stale_check = time.monotonic()
+            requeued = job_store.requeue_stale(config.WORKER_STALE_SECONDS)
+            if requeued:
+                _log(f"{requeued} trabajos de workers caídos vuelven a la cola")
+        while len(active) < max_jobs:
+            claimed = job_store.claim_job(worker)
+            if claimed is None:
+                break
+            job_id, job, run_args = claimed
+            with jobs_lock:
+                jobs[job_id] = job
+            _log(f"Worker {worker}: trabajo {job_id} ({job.get('filename')})")
+            threading.Thread(target=_run_transcription_job, args=run_args, daemon=True).start()
+            active.append(job_id)
+        time.sleep(config.WORKER_POLL_INTERVAL)
+        for job_id in list(active):
+            with jobs_lock:
+                snapshot = copy.deepcopy(jobs[job_id])
+            # Solo si cambió: con muchos workers cada escritura compite por el único escritor de SQLite
+            if snapshot != written.get(job_id):
+                job_store.update_job(job_id, snapshot)
+                written[job_id] = snapshot
+            # Con dos pasadas el hilo termina antes que el refinamiento: cuenta el estado, no el hilo
+            if snapshot["status"] != "processing":
+                active.remove(job_id)
+                written.pop(job_id, None)
+                with jobs_lock:
+                    jobs.pop(job_id, None)
+        if active and time.monotonic() - last_heartbeat > config.WORKER_STALE_SECONDS / 4:
+            last_heartbeat = time.monotonic()
+            job_store.heartbeat(active)
+
+
+def serve_production(workers, threads):
+    """Servidor HTTP de producción: gunicorn con workers procesos de threads hilos.
+
+    Sin gunicorn (Windows) se usa waitress, que es un solo proceso con hilos.
+    """
+    if workers > 1 and job_store is None:
+        print("❌ Con varios procesos HTTP el estado de los trabajos tiene que ser compartido: "
+              "configura JOB_STORE y arranca los workers con `minutaai worker`")
+        return 1
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        try:
+            import waitress
+        except ImportError:
+            print("❌ Instala gunicorn (pip install gunicorn) o, en Windows, waitress (pip install waitress)")
+            return 1
+        print(f"🚀 waitress en {config.HOST}:{config.PORT} ({workers * threads} hilos)")
+        waitress.serve(app, host=config.HOST, port=config.PORT, threads=workers * threads)
+        return 0
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{config.HOST}:{config.PORT}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            # Las subidas grandes tardan: el latido de gthread evita cortarlas, esto es para un worker colgado
+            self.cfg.set("timeout", 120)
+
+        def load(self):
+            return app
+
+    ProductionServer().run()
+    return 0
+
+
+def main(argv=None):
+    """Comando `minutaai`: sin argumentos (o `serve`) arranca el servidor; `batch` transcribe una
+    carpeta y `worker` ejecuta los trabajos del modo producción (JOB_STORE)."""
+    import argparse
+    import batch
+    parser = argparse.ArgumentParser(prog="minutaai", description="MinutaAI - Transcripción de audio/video")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser("serve", help="Servidor web (por defecto)")
+    serve.add_argument("--workers", type=int, default=config.HTTP_WORKERS,
+                       help="Procesos HTTP con gunicorn (por defecto HTTP_WORKERS; 0 = servidor de desarrollo de Flask)")
+    serve.add_argument("--threads", type=int, default=config.HTTP_THREADS,
+                       help="Hilos por proceso HTTP (por defecto HTTP_THREADS)")
+    worker = commands.add_parser("worker", help="Proceso de transcripción del modo producción (JOB_STORE)")
+    worker.add_argument("--jobs", type=int, default=config.WORKER_JOBS,
+                        help="Trabajos a la vez en este proceso (por defecto WORKER_JOBS)")
+    batch.add_arguments(commands.add_parser("batch", help="Transcribir una carpeta sin servidor"))
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        return 0 if batch.run(args) else 1
+    setup_server()
+    if args.command == "worker":
+        if job_store is None:
+            print("❌ El worker necesita JOB_STORE (la base compartida con el servidor)")
+            return 1
+        try:
+            run_worker(args.jobs)
+        except KeyboardInterrupt:
+            print("\n👋 Worker detenido; sus trabajos en curso vuelven a la cola tras WORKER_STALE_SECONDS")
+        return 0
+    if getattr(args, "workers", 0):
+        return serve_production(args.workers, args.threads)
+    if job_store is not None:
+        print("ℹ️  JOB_STORE activo: los trabajos los transcriben los procesos de `minutaai worker`")
     app.run(
         debug=config.DEBUG, 
         host=config.HOST, 
         port=config.PORT
-    ) 
\ No newline at end of file
+    )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
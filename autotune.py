@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Calibración de MinutaAI para este equipo
+Transcribe audio sintético con el modelo configurado probando varias combinaciones de
+duración de chunk, procesos de inferencia e hilos, mide el RTF de cada una y guarda la
+mejor en AUTOTUNE_FILE para este equipo. Al arrancar, app.py aplica esos valores (las
+variables de entorno que se fijen a mano tienen prioridad).
+
+Uso:
+    python autotune.py
+    python autotune.py --seconds 300 --chunk-durations 20 30 --workers 0 2 4 --threads 0 4
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from itertools import product
+
+import numpy as np
+
+from config import get_config
+
+config = get_config()
+
+# Ajustes que se calibran: nombre en Config (= variable de entorno) -> tipo
+TUNED_SETTINGS = {"CHUNK_DURATION": int, "INFERENCE_PROCESSES": int, "CPU_THREADS": int}
+
+
+def host_key():
+    """Identificador del equipo en AUTOTUNE_FILE (nombre + número de CPUs)."""
+    return f"{platform.node()}-{os.cpu_count()}cpu"
+
+
+def load_results(path=None):
+    """Contenido de AUTOTUNE_FILE ({} si no existe o no se puede leer)."""
+    path = path or config.AUTOTUNE_FILE
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def apply_saved_settings(cfg=None):
+    """Aplicar a Config los ajustes calibrados para este equipo. Devuelve los aplicados.
+
+    No toca los ajustes fijados con variables de entorno.
+    """
+    cfg = cfg or config
+    saved = load_results().get(host_key())
+    if not saved:
+        return {}
+    applied = {}
+    for name, cast in TUNED_SETTINGS.items():
+        if name in saved["settings"] and name not in os.environ:
+            setattr(cfg, name, cast(saved["settings"][name]))
+            applied[name] = getattr(cfg, name)
+    return applied
+
+
+def synthetic_pcm(path, seconds, sample_rate=16000):
+    """PCM int16 16 kHz mono parecido a voz: armónicos con modulación silábica y ruido."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) * (np.sin(2 * np.pi * 0.2 * t) > -0.6)
+    audio = 0.1 * voice * syllables + 0.01 * rng.standard_normal(t.size)
+    (np.clip(audio, -1, 1) * 32767).astype(np.int16).tofile(path)
+
+
+def run_trial(seconds, model_name):
+    """Una combinación (ya fijada en el entorno): devuelve {'seconds', 'rtf'} sin contar la carga del modelo."""
+    import app
+    from shared_audio import SharedPcm
+
+    app.setup_server()
+    pcm_path = os.path.join(config.UPLOAD_FOLDER, f"autotune_{os.getpid()}.pcm")
+    synthetic_pcm(pcm_path, seconds)
+    shared = None
+    try:
+        if config.INFERENCE_PROCESSES > 0:
+            shared = SharedPcm.from_file(pcm_path)
+            chunks = shared.chunks(config.CHUNK_DURATION, app.PCM_SAMPLE_RATE)
+        else:
+            chunks = app.split_pcm_into_chunks(pcm_path)
+        options = config.get_decoding_options()
+        language = config.WHISPER_LANGUAGE or "es"
+        # Calentamiento: cargar el modelo (en cada proceso de inferencia) antes de medir
+        app._transcribe(chunks[:max(1, config.INFERENCE_PROCESSES)], model_name,
+                        decode_options=options, language=language, keep_files=True)
+        start = time.perf_counter()
+        app._transcribe(chunks, model_name, decode_options=options, language=language, keep_files=True)
+        elapsed = time.perf_counter() - start
+    finally:
+        chunks = None
+        if shared is not None:
+            shared.release()
+        os.remove(pcm_path)
+    return {"seconds": round(elapsed, 2), "rtf": round(elapsed / seconds, 4)}
+
+
+def calibrate(seconds, model_name, chunk_durations, workers, threads):
+    """Probar cada combinación en un proceso nuevo y devolver los resultados ordenados por RTF."""
+    results = []
+    n_cpus = os.cpu_count() or 1
+    for chunk_duration, n_workers, n_threads in product(chunk_durations, workers, threads):
+        if n_workers > n_cpus or n_threads > n_cpus:
+            continue
+        settings = {"CHUNK_DURATION": chunk_duration, "INFERENCE_PROCESSES": n_workers,
+                    "CPU_THREADS": n_threads}
+        print(f"\n📋 {settings}...")
+        env = dict(os.environ, **{k: str(v) for k, v in settings.items()})
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--trial", "--seconds", str(seconds),
+             "--model", model_name],
+            env=env, capture_output=True, text=True,
+        )
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            print(f"❌ Falló: {(proc.stderr or proc.stdout)[-300:]}")
+            continue
+        trial = json.loads(lines[-1])
+        print(f"✅ {trial['seconds']}s (RTF {trial['rtf']})")
+        results.append({"settings": settings, **trial})
+    return sorted(results, key=lambda r: r["rtf"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibración de MinutaAI para este equipo")
+    parser.add_argument("--model", help="Modelo Whisper (por defecto config.WHISPER_MODEL)")
+    parser.add_argument("--seconds", type=int, default=180, help="Duración del audio sintético")
+    parser.add_argument("--chunk-durations", nargs="+", type=int, default=[15, 20, 30])
+    parser.add_argument("--workers", nargs="+", type=int,
+                        help="Valores de INFERENCE_PROCESSES (por defecto 0, 2, 4... hasta las CPUs)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[0],
+                        help="Valores de CPU_THREADS (0 = todas las CPUs)")
+    parser.add_argument("--trial", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    model_name = args.model or config.WHISPER_MODEL
+
+    if args.trial:
+        print(json.dumps(run_trial(args.seconds, model_name)))
+        return True
+
+    workers = args.workers or [0] + list(range(2, (os.cpu_count() or 1) + 1, 2))
+    print("🧪 Calibración de MinutaAI")
+    print("=" * 50)
+    print(f"Equipo: {host_key()}, modelo: {model_name}, audio sintético: {args.seconds}s")
+    results = calibrate(args.seconds, model_name, args.chunk_durations, workers, args.threads)
+    if not results:
+        print("❌ Ninguna combinación terminó")
+        return False
+
+    best = results[0]
+    saved = load_results()
+    saved[host_key()] = {
+        "model": model_name,
+        "settings": best["settings"],
+        "rtf": best["rtf"],
+        "measured_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "trials": results,
+    }
+    with open(config.AUTOTUNE_FILE, "w", encoding="utf-8") as f:
+        json.dump(saved, f, indent=2, ensure_ascii=False)
+    print(f"\n🏁 Mejor: {best['settings']} (RTF {best['rtf']})")
+    print(f"Guardado en {config.AUTOTUNE_FILE}; se aplica al arrancar el servidor")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
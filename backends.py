@@ -0,0 +1,137 @@
+"""
+Backends de inferencia para MinutaAI
+
+La transcripción no llama directamente a openai-whisper sino a un backend con tres
+operaciones: cargar un modelo, transcribir una ventana (un chunk de audio) y transcribir
+un lote de ventanas. INFERENCE_BACKEND en config.py elige cuál se usa:
+
+- whisper: openai-whisper, la implementación de referencia
+- ctranslate2: faster-whisper (CTranslate2), runtime optimizado para CPU (pip install faster-whisper)
+"""
+
+import numpy as np
+import torch
+
+from config import get_config
+
+config = get_config()
+
+
+class InferenceBackend:
+    """Interfaz de un backend. Los textos se devuelven sin espacios al inicio ni al final.
+
+    decode_options son las de config.get_decoding_options (nombres de model.transcribe de
+    openai-whisper), con 'language' si el idioma ya se conoce; cada backend las traduce.
+    """
+
+    name = None
+    # True si acepta ventanas log-mel ya calculadas (MEL_PIPELINE, lotes y caché del encoder)
+    supports_mel = False
+
+    def load(self, model_name, precision=None):
+        """Cargar el modelo (precision: 'fp32', 'int8' o 'bf16'; None = INFERENCE_PRECISION)."""
+        raise NotImplementedError
+
+    def transcribe_window(self, model, audio, decode_options):
+        """Texto de un chunk float32 16 kHz mono."""
+        raise NotImplementedError
+
+    def transcribe_batch(self, model, audios, decode_options):
+        """Textos de varios chunks (por defecto, uno a uno)."""
+        return [self.transcribe_window(model, audio, decode_options) for audio in audios]
+
+    def language_probs(self, model, audio):
+        """Probabilidad de cada idioma para un chunk float32 (dict código -> probabilidad)."""
+        raise NotImplementedError
+
+
+class WhisperBackend(InferenceBackend):
+    """openai-whisper: model.transcribe por chunk; en lote, log-mel por ventanas y model.decode."""
+
+    name = "whisper"
+    supports_mel = True
+
+    def load(self, model_name, precision=None):
+        from inference import load_whisper_model
+        return load_whisper_model(model_name, precision)
+
+    def transcribe_window(self, model, audio, decode_options):
+        from inference import model_lock
+        with model_lock(model):
+            result = model.transcribe(audio, fp16=False, **decode_options)
+        return (result.get("text") or "").strip()
+
+    def transcribe_batch(self, model, audios, decode_options):
+        from whisper.audio import N_SAMPLES
+        from inference import model_lock, log_mel_windows, decode_windows
+        if any(audio.size > N_SAMPLES for audio in audios):
+            # Chunks de más de 30 s (CHUNK_DURATION > 30): una ventana no basta, uno a uno
+            return super().transcribe_batch(model, audios, decode_options)
+        options = dict(decode_options)
+        language = options.pop("language", None)
+        padded = np.zeros(len(audios) * N_SAMPLES, dtype=np.float32)
+        for j, audio in enumerate(audios):
+            audio = audio[:N_SAMPLES]
+            padded[j * N_SAMPLES:j * N_SAMPLES + audio.size] = audio
+        mels = log_mel_windows(padded, model.dims.n_mels, model.device)
+        with model_lock(model):
+            return decode_windows(model, mels, options, language)
+
+    def language_probs(self, model, audio):
+        from inference import model_lock
+        from shared_audio import language_probs
+        with model_lock(model):
+            return language_probs(audio, model)
+
+
+class CTranslate2Backend(InferenceBackend):
+    """faster-whisper (CTranslate2). Los modelos son seguros entre hilos; no hace falta lock."""
+
+    name = "ctranslate2"
+    COMPUTE_TYPES = {"fp32": "float32", "int8": "int8", "bf16": "bfloat16"}
+
+    def load(self, model_name, precision=None):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError(
+                "INFERENCE_BACKEND=ctranslate2 requiere faster-whisper (pip install faster-whisper)")
+        precision = precision or config.INFERENCE_PRECISION
+        if precision not in self.COMPUTE_TYPES:
+            raise ValueError(f"Precisión desconocida: {precision}")
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        return WhisperModel(model_name, device=device, compute_type=self.COMPUTE_TYPES[precision])
+
+    @staticmethod
+    def _options(decode_options):
+        """Opciones de openai-whisper -> argumentos de faster_whisper.WhisperModel.transcribe."""
+        options = dict(decode_options)
+        if "logprob_threshold" in options:
+            options["log_prob_threshold"] = options.pop("logprob_threshold")
+        # En openai-whisper beam_size=None es búsqueda voraz; en faster-whisper el defecto es 5
+        if options.get("beam_size") is None:
+            options["beam_size"] = 1
+        return {k: v for k, v in options.items() if v is not None or k.endswith("_threshold")}
+
+    def transcribe_window(self, model, audio, decode_options):
+        segments, _ = model.transcribe(audio, **self._options(decode_options))
+        return "".join(segment.text for segment in segments).strip()
+
+    def language_probs(self, model, audio):
+        _, _, all_probs = model.detect_language(audio)
+        return dict(all_probs)
+
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend, CTranslate2Backend)}
+_instances = {}
+
+
+def get_backend(name=None):
+    """Backend configurado (None = INFERENCE_BACKEND). ValueError si no existe."""
+    name = (name or config.INFERENCE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de inferencia desconocido: {name}")
+    backend = _instances.get(name)
+    if backend is None:
+        backend = _instances[name] = BACKENDS[name]()
+    return backend
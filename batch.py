@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Transcripción por lotes de MinutaAI (sin servidor)
+Recorre una carpeta (y sus subcarpetas) y transcribe cada audio/video con el mismo pipeline
+que el servidor (sondeo, decodificación a PCM, chunks y transcribe_chunks de app.py), sin
+pasar por HTTP. Cada archivo va a uno de los procesos del pool, que cargan el modelo una vez
+y se reparten las CPUs (ver cpu_planner). Los archivos que ya tienen su TXT se saltan, el
+avance queda en un manifiesto (una línea JSON por archivo terminado) y al final se muestra
+el rendimiento total.
+
+Uso:
+    minutaai batch /ruta/grabaciones --output /ruta/transcripciones --workers 4
+    python batch.py /ruta/grabaciones --model small --language es
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import get_config
+from cpu_planner import available_cpus, init_inference_process
+from autotune import apply_saved_settings
+
+config = get_config()
+
+# Manifiesto por defecto, en la carpeta de salida (o en la de entrada si no hay --output)
+MANIFEST_NAME = "minutaai_manifest.jsonl"
+
+
+def find_media(root):
+    """Archivos de audio/video admitidos bajo root (ordenados; sin ocultos)."""
+    if os.path.isfile(root):
+        return [root]
+    allowed = config.get_allowed_extensions()
+    found = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if not name.startswith(".") and name.rsplit(".", 1)[-1].lower() in allowed:
+                found.append(os.path.join(directory, name))
+    return found
+
+
+def output_path_for(path, root, output_dir=None):
+    """TXT de path: misma ruta relativa bajo output_dir, o junto al original."""
+    stem = os.path.splitext(path)[0]
+    if not output_dir:
+        return f"{stem}.txt"
+    base = root if os.path.isdir(root) else os.path.dirname(root)
+    return os.path.join(output_dir, f"{os.path.relpath(stem, base)}.txt")
+
+
+def load_manifest(path):
+    """Última entrada del manifiesto por archivo ({} si no existe)."""
+    entries = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # línea a medias de una ejecución interrumpida
+                entries[entry["path"]] = entry
+    except OSError:
+        pass
+    return entries
+
+
+def _init_worker(counter, n_workers):
+    """initializer del pool: cada proceso transcribe en sí mismo y toma su parte de las CPUs.
+
+    Importar app no cambia ni la configuración ni los hilos (ver app.setup_server); los ajustes
+    calibrados se aplican aquí, salvo INFERENCE_PROCESSES: el pool ya reparte los procesos.
+    """
+    apply_saved_settings()
+    config.INFERENCE_PROCESSES = 0
+    init_inference_process(counter, n_workers)
+
+
+def transcribe_file(path, output_path, model_name, profile=None, language=None):
+    """Transcribir un archivo completo en este proceso y escribir su TXT. Devuelve sus métricas."""
+    import app
+
+    start = time.perf_counter()
+    media = app.probe_media(path)
+    if media is None or not app.has_audio(media):
+        raise RuntimeError("No se pudo leer el archivo" if media is None else "El archivo no tiene pista de audio")
+
+    # Igual que un trabajo del servidor: WAV 16kHz mono leído en su sitio, o un PCM decodificado
+    # en una pasada (FFmpeg lee también la pista de audio de los videos, sin WAV intermedio)
+    pcm_path = None
+    wav_data = app.pcm16k_wav_data(path)
+    if wav_data:
+        chunks = app.split_pcm_into_chunks(path, offset=wav_data[0], size=wav_data[1])
+    else:
+        pcm_path = os.path.join(config.UPLOAD_FOLDER, f"batch_{uuid.uuid4().hex}.pcm")
+        if not app.decode_to_pcm(path, pcm_path):
+            raise RuntimeError("No se pudo decodificar el audio")
+        chunks = app.split_pcm_into_chunks(pcm_path)
+    try:
+        if not language and model_name.endswith(".en"):
+            language = "en"
+        language = language or app.detect_language(chunks, app.get_whisper_model(model_name))
+        if language == "en" and config.ENGLISH_MODEL_ROUTING:
+            model_name = app.english_model_variant(model_name)
+        stats = {}
+        texts = app._transcribe(chunks, model_name, decode_options=config.get_decoding_options(profile),
+                                language=language, stats=stats)
+    finally:
+        # Soltar las vistas del memmap antes de borrar el PCM (en Windows no se puede borrar abierto)
+        chunks = None
+        if pcm_path and os.path.exists(pcm_path):
+            os.remove(pcm_path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(" ".join(texts))
+    os.replace(tmp_path, output_path)
+    return {
+        "duration_sec": round(media.duration or 0, 1),
+        "elapsed_sec": round(time.perf_counter() - start, 2),
+        "model": model_name,
+        "language": language,
+        **stats,
+    }
+
+
+def _format_hours(seconds):
+    return f"{seconds / 3600:.2f} h" if seconds >= 3600 else f"{seconds / 60:.1f} min"
+
+
+def add_arguments(parser):
+    """Argumentos de `minutaai batch` (también los de `python batch.py`)."""
+    parser.add_argument("input", help="Carpeta (se recorre con sus subcarpetas) o archivo")
+    parser.add_argument("--output", help="Carpeta de los TXT (por defecto junto a cada original)")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS,
+                        help="Procesos en paralelo (por defecto BATCH_WORKERS; 0 = uno por cada 4 CPUs)")
+    parser.add_argument("--model", help="Modelo Whisper (por defecto config.WHISPER_MODEL)")
+    parser.add_argument("--profile", choices=sorted(config.DECODING_PROFILES),
+                        help="Perfil de decodificación (por defecto DEFAULT_DECODING_PROFILE)")
+    parser.add_argument("--language", help="Idioma de todos los archivos (por defecto se detecta en cada uno)")
+    parser.add_argument("--manifest", help=f"Manifiesto de avance (por defecto {MANIFEST_NAME} en la salida)")
+    parser.add_argument("--force", action="store_true", help="Transcribir también los que ya tienen TXT")
+
+
+def run(args):
+    """Ejecutar el lote descrito por args (ver add_arguments). True si no hubo errores."""
+    root = os.path.abspath(args.input)
+    if not os.path.exists(root):
+        print(f"❌ No existe: {root}")
+        return False
+    model_name = args.model or config.WHISPER_MODEL
+    language = None
+    if args.language:
+        from app import normalize_language
+        try:
+            language = normalize_language(args.language)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+    manifest_path = args.manifest or os.path.join(
+        args.output or (root if os.path.isdir(root) else os.path.dirname(root)), MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    # Se salta lo que ya tiene TXT, salvo que el original haya cambiado desde que se transcribió
+    pending = []
+    skipped = 0
+    for path in find_media(root):
+        output_path = output_path_for(path, root, args.output)
+        stat = os.stat(path)
+        entry = manifest.get(path)
+        changed = entry is not None and (entry.get("size"), entry.get("mtime")) != (stat.st_size, stat.st_mtime)
+        if os.path.exists(output_path) and not changed and not args.force:
+            skipped += 1
+            continue
+        pending.append((path, output_path, stat))
+
+    n_workers = args.workers or max(1, len(available_cpus()) // 4)
+    n_workers = max(1, min(n_workers, len(pending)))
+    print("🗂️  Transcripción por lotes de MinutaAI")
+    print("=" * 50)
+    print(f"{len(pending)} archivos por transcribir, {skipped} ya transcritos; modelo {model_name}, "
+          f"{n_workers} procesos")
+    if not pending:
+        return True
+
+    os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    done = failed = 0
+    audio_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, initializer=_init_worker,
+                             initargs=(context.Value("i", 0), n_workers)) as pool, \
+            open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        futures = {
+            pool.submit(transcribe_file, path, output_path, model_name, args.profile, language): (path, output_path, stat)
+            for path, output_path, stat in pending
+        }
+        try:
+            for future in as_completed(futures):
+                path, output_path, stat = futures[future]
+                entry = {"path": path, "output": output_path, "size": stat.st_size, "mtime": stat.st_mtime,
+                         "finished_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+                try:
+                    entry.update(future.result(), status="done")
+                    done += 1
+                    audio_seconds += entry["duration_sec"]
+                    message = f"✅ {entry['duration_sec']}s de audio en {entry['elapsed_sec']}s"
+                except Exception as e:
+                    entry.update(status="error", error=str(e))
+                    failed += 1
+                    message = f"❌ {e}"
+                manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                manifest_file.flush()
+                elapsed = time.perf_counter() - start
+                print(f"[{done + failed}/{len(pending)}] {os.path.relpath(path, os.path.dirname(root))}: {message} "
+                      f"(acumulado {audio_seconds / elapsed:.2f}× tiempo real)", flush=True)
+        except KeyboardInterrupt:
+            print("\n⏹️  Interrumpido; lo terminado está en el manifiesto y se salta en la próxima ejecución")
+            # shutdown(cancel_futures=True) es de Python 3.9+
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+            return False
+
+    elapsed = time.perf_counter() - start
+    print("\n🏁 Lote terminado")
+    print(f"Archivos: {done} transcritos, {failed} con error, {skipped} saltados")
+    print(f"Audio: {_format_hours(audio_seconds)} en {_format_hours(elapsed)} "
+          f"({audio_seconds / elapsed:.2f}× tiempo real, RTF {elapsed / audio_seconds if audio_seconds else 0:.3f}, "
+          f"{done / elapsed * 3600:.0f} archivos/h)")
+    print(f"Manifiesto: {manifest_path}")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcripción por lotes de MinutaAI")
+    add_arguments(parser)
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmark de transcripción para MinutaAI
+Mide la velocidad (RTF = segundos de cómputo / segundos de audio) de cada variante y,
+si se da una transcripción de referencia, la tasa de error por palabra (WER).
+
+Uso:
+    python benchmark.py reunion.wav --reference reunion.txt
+    python benchmark.py reunion.mp3 --model small --profiles fast accurate --json resultados.json
+    python benchmark.py reunion.wav --mel   # además: log-mel por bloques vs por chunk
+    python benchmark.py reunion.wav --reference reunion.txt --precisions fp32 int8 bf16
+    python benchmark.py reunion.wav --reference reunion.txt --backends whisper ctranslate2
+    python benchmark.py reunion.wav --reference reunion.txt --rates 1.3 1.5   # aceleración (atempo)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+
+def normalize_words(text):
+    """Minúsculas y solo palabras (sin puntuación) para comparar transcripciones"""
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """WER = (sustituciones + borrados + inserciones) / palabras de la referencia"""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    # Distancia de Levenshtein por palabras, una fila a la vez
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def run_case(name, transcribe, duration, reference=None):
+    """Ejecutar una variante: transcribe() devuelve el texto completo"""
+    print(f"\n📋 {name}...")
+    start = time.perf_counter()
+    text = transcribe()
+    elapsed = time.perf_counter() - start
+    result = {
+        "name": name,
+        "seconds": round(elapsed, 2),
+        "rtf": round(elapsed / duration, 4) if duration else None,
+        "wer": round(word_error_rate(reference, text), 4) if reference is not None else None,
+    }
+    print(f"✅ {elapsed:.1f}s (RTF {result['rtf']})" +
+          (f", WER {result['wer']:.2%}" if result["wer"] is not None else ""))
+    return result
+
+
+def benchmark_mel(chunk_audios, n_mels, duration, block_windows):
+    """Segundos de log-mel por hora de audio: por chunk (como model.transcribe) vs por bloques"""
+    import whisper
+    from whisper.audio import N_SAMPLES
+    from inference import log_mel_windows
+
+    print("\n📋 Log-mel por chunk vs por bloques...")
+    start = time.perf_counter()
+    for audio in chunk_audios:
+        # model.transcribe rellena cada chunk con 30 s de ceros y calcula su propio log-mel
+        whisper.log_mel_spectrogram(audio, n_mels, padding=N_SAMPLES)
+    per_chunk = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for b in range(0, len(chunk_audios), block_windows):
+        block = chunk_audios[b:b + block_windows]
+        audio = np.zeros(len(block) * N_SAMPLES, dtype=np.float32)
+        for j, samples in enumerate(block):
+            samples = samples[:N_SAMPLES]
+            audio[j * N_SAMPLES:j * N_SAMPLES + samples.size] = samples
+        log_mel_windows(audio, n_mels)
+    batched = time.perf_counter() - start
+
+    hours = duration / 3600
+    result = {
+        "per_chunk_sec_per_audio_hour": round(per_chunk / hours, 2),
+        "batched_sec_per_audio_hour": round(batched / hours, 2),
+        "saved_sec_per_audio_hour": round((per_chunk - batched) / hours, 2),
+    }
+    print(f"✅ Por chunk: {result['per_chunk_sec_per_audio_hour']}s/h de audio, "
+          f"por bloques: {result['batched_sec_per_audio_hour']}s/h "
+          f"(ahorro {result['saved_sec_per_audio_hour']}s por hora de audio)")
+    return result
+
+
+def print_rate_summary(baselines, accelerated):
+    """Aceleración: cuánto más rápido que a velocidad normal y cuánto cambia el WER"""
+    print("\nAceleración (frente a velocidad normal con el mismo perfil):")
+    for r in accelerated:
+        base = baselines.get(r["profile"])
+        if not base:
+            continue
+        r["speedup"] = round(base["seconds"] / r["seconds"], 2) if r["seconds"] else None
+        line = f"  {r['name']}: {r['speedup']}× más rápido"
+        if r["wer"] is not None and base["wer"] is not None:
+            r["wer_delta"] = round(r["wer"] - base["wer"], 4)
+            line += f", WER {r['wer_delta'] * 100:+.1f} puntos"
+        print(line)
+
+
+def print_table(results):
+    """Resumen en tabla"""
+    print("\n" + "=" * 62)
+    print(f"{'Variante':<30}{'Tiempo (s)':>12}{'RTF':>10}{'WER':>10}")
+    for r in results:
+        wer = f"{r['wer']:.2%}" if r["wer"] is not None else "-"
+        print(f"{r['name']:<30}{r['seconds']:>12}{r['rtf']:>10}{wer:>10}")
+    print("=" * 62)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de transcripción de MinutaAI")
+    parser.add_argument("audio", help="Archivo de audio a transcribir")
+    parser.add_argument("--reference", help="TXT con la transcripción correcta (para calcular WER)")
+    parser.add_argument("--model", help="Modelo Whisper (por defecto config.WHISPER_MODEL)")
+    parser.add_argument("--profiles", nargs="+", help="Perfiles de decodificación a comparar (por defecto todos)")
+    parser.add_argument("--mel", action="store_true",
+                        help="Comparar también el log-mel por bloques (MEL_PIPELINE) con el de model.transcribe")
+    parser.add_argument("--precisions", nargs="+", choices=["fp32", "int8", "bf16"],
+                        help="Precisiones de inferencia a comparar (por defecto config.INFERENCE_PRECISION)")
+    parser.add_argument("--backends", nargs="+",
+                        help="Backends de inferencia a comparar (por defecto config.INFERENCE_BACKEND)")
+    parser.add_argument("--rates", nargs="+", type=float,
+                        help="Velocidades de reproducción a comparar con la normal (p. ej. 1.3 1.5)")
+    parser.add_argument("--json", help="Guardar resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    import app
+    from app import config
+    app.setup_server()
+    from backends import get_backend
+
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = f.read()
+
+    print("🧪 Benchmark de MinutaAI")
+    print("=" * 50)
+    info = app.get_audio_duration_and_chunks(args.audio)
+    if not info:
+        print("❌ No se pudo leer el audio")
+        return False
+    duration, _ = info
+    model_name = args.model or config.WHISPER_MODEL
+    print(f"Audio: {args.audio} ({duration:.1f}s), modelo: {model_name}")
+
+    chunks = app.split_audio_into_chunks(args.audio)
+    if not chunks:
+        print("❌ No se pudo dividir el audio")
+        return False
+    precisions = args.precisions or [config.INFERENCE_PRECISION]
+    backends = [get_backend(name) for name in args.backends or [config.INFERENCE_BACKEND]]
+
+    results = []
+    baselines = {}  # perfil -> resultado a velocidad normal (primer backend y precisión)
+    accelerated = []
+    mel_result = None
+    try:
+        for backend in backends:
+            for precision in precisions:
+                try:
+                    model = app.get_whisper_model(model_name, precision, backend)
+                except RuntimeError as e:
+                    print(f"❌ {backend.name}: {e}")
+                    break
+                suffix = f" {backend.name}" if len(backends) > 1 else ""
+                if len(precisions) > 1:
+                    suffix += f" {precision}"
+                for profile in args.profiles or list(config.DECODING_PROFILES):
+                    options = config.get_decoding_options(profile)
+                    results.append(run_case(
+                        f"perfil {profile}{suffix}",
+                        lambda: " ".join(app.transcribe_chunks(chunks, model, keep_files=True,
+                                                               decode_options=options, backend=backend)),
+                        duration, reference,
+                    ))
+                    baselines.setdefault(profile, results[-1])
+                    if args.mel and backend.supports_mel:
+                        results.append(run_case(
+                            f"perfil {profile}{suffix} + mel",
+                            lambda: " ".join(app.transcribe_chunks_mel(chunks, model, keep_files=True,
+                                                                       decode_options=options)),
+                            duration, reference,
+                        ))
+        for rate in args.rates or []:
+            if rate == 1.0:
+                continue
+            # El audio acelerado se divide igual que en un trabajo con playback_rate
+            rate_chunks = app.split_audio_into_chunks(args.audio, playback_rate=rate)
+            model = app.get_whisper_model(model_name, precisions[0], backends[0])
+            try:
+                for profile in args.profiles or list(config.DECODING_PROFILES):
+                    options = config.get_decoding_options(profile)
+                    result = run_case(
+                        f"perfil {profile} ×{rate:g}",
+                        lambda: " ".join(app.transcribe_chunks(rate_chunks, model, keep_files=True,
+                                                               decode_options=options, backend=backends[0])),
+                        duration, reference,
+                    )
+                    result.update(profile=profile, playback_rate=rate)
+                    results.append(result)
+                    accelerated.append(result)
+            finally:
+                app.remove_chunk_files(rate_chunks)
+        if args.mel and backends[0].supports_mel:
+            chunk_audios = [app._load_chunk_audio(c) for c in chunks]
+            model = app.get_whisper_model(model_name, precisions[0], backends[0])
+            mel_result = benchmark_mel(chunk_audios, model.dims.n_mels, duration, config.MEL_BLOCK_WINDOWS)
+    finally:
+        for chunk_path in chunks:
+            if os.path.exists(chunk_path):
+                os.remove(chunk_path)
+
+    print_table(results)
+    if accelerated:
+        print_rate_summary(baselines, accelerated)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"audio": args.audio, "duration_sec": duration, "model": model_name,
+                       "backends": [b.name for b in backends],
+                       "precisions": precisions, "results": results, "mel": mel_result}, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.json}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -16,6 +16,44 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB
     
+    # Subidas reanudables (/upload/resumable): tamaño de cada trozo que envía la interfaz y horas
+    # sin actividad tras las que se borra una subida sin terminar
+    RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+    RESUMABLE_UPLOAD_TTL_HOURS = 24
+    
+    # Lotes (/batch): archivos como máximo por petición (todos juntos sin pasar de MAX_CONTENT_LENGTH)
+    MAX_BATCH_FILES = int(os.environ.get('MAX_BATCH_FILES', '100'))
+    
+    # Modo producción: base SQLite con el estado de trabajos y lotes, compartida por los procesos
+    # HTTP (`minutaai serve --workers N`) y los de transcripción (`minutaai worker`). Vacío = todo
+    # en el proceso del servidor, como con `python app.py`
+    JOB_STORE = os.environ.get('JOB_STORE', '')
+    HTTP_WORKERS = int(os.environ.get('HTTP_WORKERS', '0'))  # 0 = servidor de desarrollo de Flask
+    HTTP_THREADS = int(os.environ.get('HTTP_THREADS', '4'))
+    # Trabajos a la vez por `minutaai worker` (con 2, el siguiente se decodifica mientras otro se
+    # transcribe), segundos entre escrituras de su estado y sin latido tras los que vuelve a la cola
+    WORKER_JOBS = int(os.environ.get('WORKER_JOBS', '2'))
+    WORKER_POLL_INTERVAL = 0.5
+    WORKER_STALE_SECONDS = 120
+    
+    # Ingesta por ruta (/upload/path): directorios del servidor (p. ej. un NAS montado) cuyos
+    # archivos se pueden transcribir sin subirlos, separados por os.pathsep. Vacío = desactivada
+    INGEST_ROOTS = [p for p in os.environ.get('INGEST_ROOTS', '').split(os.pathsep) if p]
+    
+    # Carpeta vigilada (python watch_folder.py): cada archivo nuevo se transcribe y el TXT se
+    # escribe en WATCH_OUTPUT_FOLDER (vacío = junto al original). Un archivo se toma cuando lleva
+    # WATCH_SETTLE_SECONDS sin cambiar; como mucho WATCH_MAX_ACTIVE trabajos a la vez
+    WATCH_FOLDER = os.environ.get('WATCH_FOLDER', '')
+    WATCH_OUTPUT_FOLDER = os.environ.get('WATCH_OUTPUT_FOLDER', '')
+    WATCH_INTERVAL = float(os.environ.get('WATCH_INTERVAL', '10'))
+    WATCH_SETTLE_SECONDS = float(os.environ.get('WATCH_SETTLE_SECONDS', '30'))
+    WATCH_MAX_ACTIVE = int(os.environ.get('WATCH_MAX_ACTIVE', '2'))
+    WATCH_STATE_FILE = os.environ.get('WATCH_STATE_FILE', 'watch_state.json')
+    
+    # Lotes sin servidor (minutaai batch): procesos en paralelo, cada uno con su modelo y su parte
+    # de las CPUs. 0 = uno por cada 4 CPUs
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', '0'))
+    
     # Formatos permitidos
     ALLOWED_AUDIO_EXTENSIONS = {
         'mp3', 'wav', 'm4a', 'aac', 'ogg', 'flac', 'wma'
@@ -28,8 +66,120 @@ class Config:
     # Configuración de Whisper (puede sobrescribirse con env WHISPER_MODEL)
     WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'base')  # tiny, base, small, medium, large
     
+    # Idioma: se detecta una sola vez por trabajo (o se toma esta pista / el campo 'language'
+    # de la subida) y se reutiliza en todos los chunks. None = detectar.
+    WHISPER_LANGUAGE = os.environ.get('WHISPER_LANGUAGE') or None
+    LANGUAGE_DETECT_CHUNKS = 2  # chunks con audio que se usan para detectar el idioma
+    ENGLISH_MODEL_ROUTING = True  # si el idioma es inglés, usar la variante '.en' (más rápida)
+    
+    # Degradación adaptativa del modelo cuando hay cola (env ADAPTIVE_MODEL=1 para activar).
+    # Nunca se usa un modelo mayor que WHISPER_MODEL; solo se baja cuando hay carga.
+    ADAPTIVE_MODEL = os.environ.get('ADAPTIVE_MODEL', '0').lower() in ('1', 'true', 'yes')
+    WHISPER_MODEL_ORDER = ['tiny', 'base', 'small', 'medium', 'large']  # de más rápido a más lento
+    # (trabajos en curso >= N, modelo máximo); se aplica la regla más restrictiva que se cumpla
+    ADAPTIVE_QUEUE_THRESHOLDS = [(4, 'tiny'), (2, 'base')]
+    # (duración del audio >= segundos, modelo máximo); solo si hay otros trabajos en curso
+    ADAPTIVE_DURATION_THRESHOLDS = [(2 * 3600, 'tiny'), (3600, 'base')]
+    
+    # Modo de dos pasadas: borrador rápido con DRAFT_WHISPER_MODEL y refinamiento en segundo
+    # plano con el modelo configurado (env TWO_PASS=1 lo activa por defecto; también por subida)
+    TWO_PASS = os.environ.get('TWO_PASS', '0').lower() in ('1', 'true', 'yes')
+    DRAFT_WHISPER_MODEL = os.environ.get('DRAFT_WHISPER_MODEL', 'tiny')
+    
+    # Perfiles de decodificación (se elige por subida con el campo 'profile').
+    # temperature como tupla = reintentos con temperatura creciente si el resultado es malo;
+    # un solo valor = sin reintentos. beam_size None = búsqueda voraz.
+    DECODING_PROFILES = {
+        'fast': {
+            'beam_size': None,
+            'temperature': 0.0,
+            'compression_ratio_threshold': None,
+            'logprob_threshold': -1.0,
+            'condition_on_previous_text': False,
+        },
+        'balanced': {
+            'beam_size': None,
+            'temperature': (0.0, 0.4, 0.8),
+            'compression_ratio_threshold': 2.4,
+            'logprob_threshold': -1.0,
+            'condition_on_previous_text': False,
+        },
+        'accurate': {
+            'beam_size': 5,
+            'best_of': 5,
+            'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+            'compression_ratio_threshold': 2.4,
+            'logprob_threshold': -1.0,
+            'condition_on_previous_text': True,
+        },
+    }
+    DEFAULT_DECODING_PROFILE = os.environ.get('DECODING_PROFILE', 'balanced')
+    DRAFT_DECODING_PROFILE = 'fast'  # perfil del borrador en el modo de dos pasadas
+    
     # Configuración de chunks (audios largos: se dividen en bloques, se transcriben y se unen al final)
-    CHUNK_DURATION = 30  # segundos por bloque (15–30 recomendado; menor = más preciso, más lento)
+    CHUNK_DURATION = int(os.environ.get('CHUNK_DURATION', '30'))  # segundos por bloque (15–30 recomendado; menor = más preciso, más lento)
+    
+    # Resultado de la calibración (python autotune.py): mejores CHUNK_DURATION, INFERENCE_PROCESSES y
+    # CPU_THREADS medidos en cada equipo; se aplican al arrancar salvo los fijados por entorno
+    AUTOTUNE_FILE = os.environ.get('AUTOTUNE_FILE', 'autotune.json')
+    
+    # Aceleración: el audio se comprime en el tiempo (FFmpeg atempo, mismo tono) antes de dividirlo;
+    # 1.3–1.5 = ~25–35% menos cómputo con algo menos de precisión. Por subida: campo 'playback_rate'.
+    # Las marcas de tiempo de cada chunk se devuelven en segundos del audio original
+    PLAYBACK_RATE = float(os.environ.get('PLAYBACK_RATE', '1.0'))
+    MAX_PLAYBACK_RATE = 2.0  # límite de un solo filtro atempo
+    
+    # Audio del trabajo como un único PCM crudo 16kHz mono int16 con memoria mapeada (los chunks
+    # son vistas); False = un WAV temporal por chunk en chunks_temp (FFmpeg por chunk)
+    PCM_MMAP = True
+    
+    # Decodificar WAV/FLAC/OGG a 16kHz con libsndfile (pip install soundfile) en lugar de FFmpeg.
+    # Sin soundfile instalado solo se salta FFmpeg con los WAV que ya están en 16kHz mono 16-bit
+    SOUNDFILE_DECODE = os.environ.get('SOUNDFILE_DECODE', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Procesos de inferencia: 0 = transcribir en el proceso del servidor. Con N > 0 el PCM del
+    # trabajo se copia una vez a memoria compartida y N procesos transcriben sus chunks desde ahí
+    INFERENCE_PROCESSES = int(os.environ.get('INFERENCE_PROCESSES', '0'))
+    
+    # Reparto de CPU (cpu_planner.py): los núcleos se dividen entre los procesos de inferencia (o el
+    # servidor si INFERENCE_PROCESSES = 0) y cada uno fija sus hilos de torch y de FFmpeg.
+    # CPU_THREADS = 0 usa todas las CPUs disponibles; FFMPEG_THREADS = 0 = la mitad de las del worker;
+    # CPU_PINNING=1 ancla cada proceso de inferencia a sus CPUs (solo Linux)
+    CPU_THREADS = int(os.environ.get('CPU_THREADS', '0'))
+    FFMPEG_THREADS = int(os.environ.get('FFMPEG_THREADS', '0'))
+    CPU_PINNING = os.environ.get('CPU_PINNING', '0').lower() in ('1', 'true', 'yes')
+    
+    # Log-mel por bloques: una STFT por cada MEL_BLOCK_WINDOWS chunks y decodificación por
+    # ventanas de 30 s alineadas (sin el relleno ni la FFT propia de cada model.transcribe).
+    # Requiere CHUNK_DURATION <= 30 y no aplica con INFERENCE_PROCESSES > 0. Env MEL_PIPELINE=1.
+    MEL_PIPELINE = os.environ.get('MEL_PIPELINE', '0').lower() in ('1', 'true', 'yes')
+    MEL_BLOCK_WINDOWS = 20  # ventanas de 30 s por STFT (20 = 10 min de audio, ~150 MB de pico)
+    
+    # Lotes dinámicos (con MEL_PIPELINE): las ventanas de todos los trabajos que usan el mismo
+    # modelo se juntan hasta BATCH_MAX_SIZE o BATCH_MAX_WAIT_MS y se decodifican juntas
+    BATCHING = os.environ.get('BATCHING', '0').lower() in ('1', 'true', 'yes')
+    BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '8'))
+    BATCH_MAX_WAIT_MS = 50
+    
+    # Caché en disco de la salida del encoder por ventana (con MEL_PIPELINE), por hash del audio
+    # y modelo: volver a transcribir el mismo audio con otro idioma o perfil solo decodifica
+    ENCODER_CACHE = os.environ.get('ENCODER_CACHE', '0').lower() in ('1', 'true', 'yes')
+    ENCODER_CACHE_DIR = os.environ.get('ENCODER_CACHE_DIR', 'encoder_cache')
+    ENCODER_CACHE_MAX_MB = int(os.environ.get('ENCODER_CACHE_MAX_MB', '2048'))
+    
+    # Backend de inferencia: 'whisper' (openai-whisper, referencia) o 'ctranslate2' (faster-whisper).
+    # MEL_PIPELINE, los lotes y la caché del encoder solo se usan con 'whisper'
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'whisper').lower()
+    
+    # Precisión de inferencia en CPU: 'fp32', 'int8' (cuantización dinámica de las capas lineales;
+    # el modelo cuantizado se guarda en QUANTIZED_MODEL_DIR) o 'bf16' (solo CPUs con AVX512-BF16/AMX)
+    INFERENCE_PRECISION = os.environ.get('INFERENCE_PRECISION', 'fp32').lower()
+    QUANTIZED_MODEL_DIR = os.environ.get('QUANTIZED_MODEL_DIR', 'quantized_models')
+    
+    # Silencio: los chunks por debajo de estos niveles (amplitud en [-1, 1]) no pasan por Whisper
+    SILENCE_CHECK = True
+    SILENCE_RMS_THRESHOLD = 0.001   # ~ -60 dBFS
+    SILENCE_PEAK_THRESHOLD = 0.005  # ~ -46 dBFS
     
     # Configuración de limpieza
     CLEANUP_TEMP_FILES = True
@@ -39,6 +189,14 @@ class Config:
         """Obtener todas las extensiones permitidas"""
         return cls.ALLOWED_AUDIO_EXTENSIONS.union(cls.ALLOWED_VIDEO_EXTENSIONS)
     
+    @classmethod
+    def get_decoding_options(cls, profile=None):
+        """Opciones para model.transcribe del perfil indicado (None = perfil por defecto)"""
+        profile = profile or cls.DEFAULT_DECODING_PROFILE
+        if profile not in cls.DECODING_PROFILES:
+            raise ValueError(f"Perfil de decodificación desconocido: {profile}")
+        return dict(cls.DECODING_PROFILES[profile])
+    
     @classmethod
     def get_file_type(cls, filename):
         """Determinar tipo de archivo basado en extensión"""
@@ -0,0 +1,117 @@
+"""
+Reparto de CPU para MinutaAI
+
+Cada instancia de PyTorch abre por defecto tantos hilos intra-op como núcleos tiene la
+máquina; con varios procesos de inferencia y FFmpeg decodificando a la vez, los hilos
+se pisan y el rendimiento cae por debajo del de un solo trabajo. El planificador reparte
+los núcleos entre los workers de inferencia (el propio servidor o los INFERENCE_PROCESSES),
+fija los hilos de torch y de FFmpeg de cada uno y, en Linux, puede anclar cada worker a
+su conjunto de CPUs (CPU_PINNING).
+"""
+
+import os
+from collections import namedtuple
+
+from config import get_config
+
+config = get_config()
+
+# Plan de un worker: CPUs asignadas, hilos intra/inter-op de torch e hilos de FFmpeg
+WorkerPlan = namedtuple("WorkerPlan", ["cpus", "intra_op_threads", "inter_op_threads", "ffmpeg_threads"])
+
+# Plan del proceso actual (None hasta apply_plan)
+_current_plan = None
+# Núcleos físicos / CPUs lógicas (torch usa por defecto un hilo por núcleo físico)
+_cores_per_cpu = None
+
+
+def available_cpus():
+    """CPUs que puede usar este proceso (respeta taskset/cgroups en Linux), limitadas por CPU_THREADS."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    if config.CPU_THREADS > 0:
+        cpus = cpus[:config.CPU_THREADS]
+    return cpus
+
+
+def _physical_ratio():
+    """Fracción de CPUs lógicas que son núcleos físicos (0.5 con hyper-threading)."""
+    global _cores_per_cpu
+    if _cores_per_cpu is None:
+        import torch
+        logical = os.cpu_count() or 1
+        # Se calcula antes del primer apply_plan, con el valor por defecto de torch
+        _cores_per_cpu = min(1.0, torch.get_num_threads() / logical)
+    return _cores_per_cpu
+
+
+def plan_workers(n_workers, cpus=None):
+    """Repartir las CPUs en n_workers conjuntos contiguos (los primeros reciben el resto).
+
+    Si hay más workers que CPUs, varios comparten CPU (un hilo cada uno). torch usa un hilo
+    por núcleo físico del conjunto; FFmpeg, la mitad: decodifica mientras otro trabajo está
+    en inferencia.
+    """
+    cpus = list(cpus if cpus is not None else available_cpus())
+    n_workers = max(1, n_workers)
+    ratio = _physical_ratio()
+    plans = []
+    for i in range(n_workers):
+        if n_workers <= len(cpus):
+            base, extra = divmod(len(cpus), n_workers)
+            start = i * base + min(i, extra)
+            share = cpus[start:start + base + (1 if i < extra else 0)]
+        else:
+            share = [cpus[i % len(cpus)]]
+        ffmpeg_threads = config.FFMPEG_THREADS or max(1, len(share) // 2)
+        intra_op_threads = max(1, round(len(share) * ratio))
+        plans.append(WorkerPlan(share, intra_op_threads, 1, ffmpeg_threads))
+    return plans
+
+
+def apply_plan(plan, pin=None):
+    """Aplicar un WorkerPlan al proceso actual (hilos de torch y, si se pide, afinidad de CPU)."""
+    global _current_plan
+    import torch
+    torch.set_num_threads(plan.intra_op_threads)
+    try:
+        torch.set_num_interop_threads(plan.inter_op_threads)
+    except RuntimeError:
+        pass  # solo se puede fijar antes del primer trabajo inter-op del proceso
+    if (config.CPU_PINNING if pin is None else pin) and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, plan.cpus)
+        except OSError as e:
+            print(f"[MinutaAI] No se pudo fijar la afinidad de CPU: {e}", flush=True)
+    _current_plan = plan
+
+
+def ffmpeg_threads():
+    """Valor de -threads para FFmpeg en este proceso."""
+    if _current_plan is not None:
+        return _current_plan.ffmpeg_threads
+    return config.FFMPEG_THREADS or max(1, len(available_cpus()) // 2)
+
+
+def configure_server():
+    """Plan del proceso del servidor.
+
+    Sin procesos de inferencia, el servidor es el único worker (las inferencias sobre un mismo
+    modelo ya van de una en una) y usa todas las CPUs. Con INFERENCE_PROCESSES > 0 los núcleos
+    son de los procesos de inferencia; el servidor solo decodifica con FFmpeg y no se ancla.
+    """
+    if config.INFERENCE_PROCESSES > 0:
+        plan = plan_workers(config.INFERENCE_PROCESSES)[0]
+        apply_plan(WorkerPlan(available_cpus(), 1, 1, plan.ffmpeg_threads), pin=False)
+    else:
+        apply_plan(plan_workers(1)[0])
+
+
+def init_inference_process(counter, n_workers):
+    """initializer del ProcessPoolExecutor: cada proceso toma el siguiente plan del reparto."""
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    apply_plan(plan_workers(n_workers)[index % n_workers])
@@ -0,0 +1,126 @@
+"""
+Lectura de audio sin FFmpeg para MinutaAI
+
+Un WAV que ya está en el formato de trabajo (PCM 16-bit, 16kHz, mono; p. ej. el que prepara
+el navegador) no necesita FFmpeg ni MoviePy: la duración sale de la cabecera y las muestras
+se leen, o se mapean en memoria, directamente del archivo. Con libsndfile (pip install
+soundfile, opcional) también se decodifican sin lanzar procesos los WAV/FLAC/OGG a 16kHz con
+cualquier número de canales o profundidad de bits. El resto sigue pasando por FFmpeg.
+"""
+
+import os
+import wave
+import struct
+
+import numpy as np
+
+from config import get_config
+
+config = get_config()
+
+# Formato de trabajo de Whisper (igual que app.PCM_SAMPLE_RATE)
+SAMPLE_RATE = 16000
+
+# Formatos de libsndfile que se decodifican sin FFmpeg
+SOUNDFILE_FORMATS = {"WAV", "FLAC", "OGG"}
+
+
+def load_soundfile():
+    """Módulo soundfile, o None si no está instalado (o libsndfile no carga) o SOUNDFILE_DECODE=False."""
+    if not config.SOUNDFILE_DECODE:
+        return None
+    try:
+        import soundfile
+    except (ImportError, OSError):
+        return None
+    return soundfile
+
+
+def is_pcm16k_wav(path):
+    """True si el archivo ya está en el formato de trabajo: WAV PCM 16-bit, 16kHz, mono."""
+    try:
+        with wave.open(path, "rb") as wav:
+            return (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, SAMPLE_RATE)
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def pcm16k_wav_data(path):
+    """(offset, bytes) de las muestras si path es un WAV 16kHz mono 16-bit; None si no lo es.
+
+    Los WAV escritos en streaming dejan el tamaño del bloque 'data' a 0 o 0xFFFFFFFF: entonces
+    las muestras llegan hasta el final del archivo.
+    """
+    if not is_pcm16k_wav(path):
+        return None
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        pos = 12
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            chunk_id, size = struct.unpack("<4sI", f.read(8))
+            if chunk_id == b"data":
+                available = file_size - pos - 8
+                if size in (0, 0xFFFFFFFF) or size > available:
+                    size = available
+                return pos + 8, size - size % 2
+            pos += 8 + size + (size & 1)
+    return None
+
+
+def decode_direct(path, pcm_path, block_seconds=60):
+    """Escribir en pcm_path el PCM 16kHz mono int16 de path sin FFmpeg.
+
+    False si el archivo necesita FFmpeg (otra frecuencia de muestreo, otro formato o
+    libsndfile no disponible).
+    """
+    data = pcm16k_wav_data(path)
+    if data:
+        offset, remaining = data
+        with open(path, "rb") as src, open(pcm_path, "wb") as out:
+            src.seek(offset)
+            while remaining > 0:
+                block = src.read(min(remaining, SAMPLE_RATE * 2 * block_seconds))
+                if not block:
+                    break
+                out.write(block)
+                remaining -= len(block)
+        return True
+
+    soundfile = load_soundfile()
+    if soundfile is None:
+        return False
+    try:
+        info = soundfile.info(path)
+    except RuntimeError:
+        return False
+    if info.format not in SOUNDFILE_FORMATS or info.samplerate != SAMPLE_RATE:
+        return False
+    with open(pcm_path, "wb") as out:
+        for block in soundfile.blocks(path, blocksize=SAMPLE_RATE * block_seconds, dtype="int16", always_2d=True):
+            if block.shape[1] > 1:
+                block = np.round(block.mean(axis=1))
+            out.write(block.astype("<i2").tobytes())
+    return True
+
+
+def split_wav_frames(path, chunk_dir, prefix, chunk_duration):
+    """WAV de cada chunk copiando frames de un WAV 16kHz mono (sin FFmpeg). None si no lo es."""
+    data = pcm16k_wav_data(path)
+    if not data:
+        return None
+    offset, size = data
+    step = int(chunk_duration * SAMPLE_RATE) * 2
+    chunks = []
+    with open(path, "rb") as src:
+        for start in range(0, size, step):
+            src.seek(offset + start)
+            frames = src.read(min(step, size - start))
+            chunk_filename = os.path.join(chunk_dir, f"{prefix}_chunk_{len(chunks)}.wav")
+            with wave.open(chunk_filename, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(SAMPLE_RATE)
+                wav.writeframes(frames)
+            chunks.append(chunk_filename)
+    return chunks
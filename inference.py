@@ -0,0 +1,392 @@
+"""
+Inferencia por ventanas de 30 s para MinutaAI
+
+En lugar de llamar a model.transcribe por chunk (que rellena cada chunk con 30 s de ceros
+y calcula su propio log-mel), el log-mel se calcula por bloques de varios chunks con una
+sola STFT y se entregan al decodificador ventanas de 30 s ya alineadas (N_FRAMES frames).
+WindowBatcher junta ventanas de uno o varios trabajos y las pasa al modelo en lote.
+EncoderCache guarda en disco la salida del encoder por ventana para volver a decodificar
+el mismo audio (otro idioma u otro perfil) sin repetir el encoder.
+load_whisper_model carga el modelo con la precisión de INFERENCE_PRECISION (fp32, int8
+dinámico o bf16).
+"""
+
+import os
+import time
+import hashlib
+import queue
+import threading
+import functools
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_FFT, HOP_LENGTH, N_SAMPLES, N_FRAMES, mel_filters
+
+from config import get_config
+from shared_audio import is_silent
+
+config = get_config()
+
+# Umbral de "no hay voz" de Whisper (el mismo que usa model.transcribe por defecto)
+NO_SPEECH_THRESHOLD = 0.6
+
+# Un lock por modelo: Whisper instala hooks de kv-cache en cada decode, así que dos hilos no
+# pueden usar el mismo modelo a la vez. Los batchers, uno por modelo.
+_model_locks = {}
+_batchers = {}
+_registry_lock = threading.Lock()
+
+
+def model_lock(model):
+    """Lock que hay que tener para ejecutar inferencia con este modelo."""
+    with _registry_lock:
+        lock = _model_locks.get(id(model))
+        if lock is None:
+            lock = _model_locks[id(model)] = threading.Lock()
+        return lock
+
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def bf16_supported():
+    """True si la CPU tiene instrucciones bf16 nativas (AVX512-BF16 o AMX); sin ellas bf16 es más lento."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def _quantize_int8(model):
+    """Cuantización dinámica int8 de las capas lineales (pesos int8, activaciones en float)."""
+    from whisper.model import Linear
+    # quantize_dynamic solo reconoce nn.Linear exacto; whisper.model.Linear solo cambia forward
+    # para convertir pesos al dtype de la entrada, que en CPU fp32 no hace nada
+    for module in model.modules():
+        if type(module) is Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _float32_output(forward):
+    """Ejecutar forward con autocast bf16 y devolver float32 (decode exige float32 con fp16=False)."""
+    @functools.wraps(forward)
+    def wrapper(*args, **kwargs):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return forward(*args, **kwargs).float()
+    return wrapper
+
+
+def _use_bf16(model):
+    """Encoder y decoder en bf16 (autocast); los pesos se quedan en fp32."""
+    model.encoder.forward = _float32_output(model.encoder.forward)
+    model.decoder.forward = _float32_output(model.decoder.forward)
+    return model
+
+
+def load_whisper_model(model_name, precision=None):
+    """Cargar un modelo Whisper con la precisión pedida (None = INFERENCE_PRECISION).
+
+    int8: el modelo ya cuantizado se guarda en QUANTIZED_MODEL_DIR y las siguientes cargas
+    lo leen de ahí. bf16 solo se usa si la CPU lo soporta; si no, se carga en fp32.
+    """
+    precision = precision or config.INFERENCE_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Precisión desconocida: {precision}")
+    if precision == "int8":
+        path = os.path.join(config.QUANTIZED_MODEL_DIR, f"{model_name}-int8.pt")
+        if os.path.exists(path):
+            try:
+                return torch.load(path, weights_only=False)
+            except Exception as e:
+                print(f"[MinutaAI] No se pudo leer {path} ({e}); se vuelve a cuantizar", flush=True)
+        model = _quantize_int8(whisper.load_model(model_name, device="cpu"))
+        os.makedirs(config.QUANTIZED_MODEL_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, path)
+        return model
+    model = whisper.load_model(model_name)
+    if precision == "bf16":
+        if model.device.type == "cpu" and bf16_supported():
+            return _use_bf16(model)
+        print("[MinutaAI] bf16 no soportado en este equipo; se usa fp32", flush=True)
+    return model
+
+
+def model_key(model_name, precision=None):
+    """Nombre para cachés por modelo: la salida del encoder cambia con la precisión."""
+    precision = precision or config.INFERENCE_PRECISION
+    return model_name if precision == "fp32" else f"{model_name}-{precision}"
+
+
+def log_mel_windows(audio, n_mels, device=None):
+    """Log-mel de k ventanas contiguas de 30 s con una sola STFT.
+
+    audio: float32 de k * N_SAMPLES muestras. Devuelve un tensor [k, n_mels, N_FRAMES]
+    normalizado por ventana igual que whisper.log_mel_spectrogram.
+    """
+    audio = torch.from_numpy(audio)
+    if device is not None:
+        audio = audio.to(device)
+    n_windows = audio.shape[-1] // N_SAMPLES
+    window = torch.hann_window(N_FFT).to(audio.device)
+    stft = torch.stft(audio, N_FFT, HOP_LENGTH, window=window, return_complex=True)
+    magnitudes = stft[..., :-1].abs() ** 2
+    del stft
+    log_spec = torch.clamp(mel_filters(audio.device, n_mels) @ magnitudes, min=1e-10).log10()
+    del magnitudes
+    # [n_mels, k * N_FRAMES] -> [k, n_mels, N_FRAMES]; el recorte a max - 8 es por ventana
+    log_spec = log_spec.reshape(n_mels, n_windows, N_FRAMES).permute(1, 0, 2)
+    log_spec = torch.maximum(log_spec, log_spec.amax(dim=(1, 2), keepdim=True) - 8.0)
+    return (log_spec + 4.0) / 4.0
+
+
+def iter_mel_windows(chunks, load_audio, n_mels, block_windows=None, device=None, digest=False):
+    """Recorrer los chunks (de 30 s como máximo) en bloques y producir (índice, mel o None, hash).
+
+    load_audio(chunk) devuelve el float32 del chunk. Cada chunk se rellena hasta 30 s,
+    el bloque se concatena y se calcula con una sola STFT. None = chunk vacío o en silencio.
+    Con digest=True el tercer valor es el hash de las muestras del chunk (si no, None).
+    """
+    if block_windows is None:
+        block_windows = config.MEL_BLOCK_WINDOWS
+    for block_start in range(0, len(chunks), block_windows):
+        block = chunks[block_start:block_start + block_windows]
+        audio = np.zeros(len(block) * N_SAMPLES, dtype=np.float32)
+        usable = []
+        digests = [None] * len(block)
+        for j, chunk in enumerate(block):
+            samples = load_audio(chunk)
+            if samples is None or samples.size == 0:
+                usable.append(False)
+                continue
+            samples = samples[:N_SAMPLES]
+            if digest:
+                digests[j] = hashlib.blake2b(samples.tobytes(), digest_size=16).hexdigest()
+            audio[j * N_SAMPLES:j * N_SAMPLES + samples.size] = samples
+            usable.append(not (config.SILENCE_CHECK and is_silent(samples)))
+        mels = log_mel_windows(audio, n_mels, device) if any(usable) else None
+        for j in range(len(block)):
+            yield block_start + j, (mels[j] if usable[j] else None), digests[j]
+
+
+@torch.no_grad()
+def encode_window(model, mel):
+    """Salida del encoder [n_audio_ctx, n_audio_state] de una ventana mel [n_mels, N_FRAMES].
+
+    model.decode acepta estas salidas en lugar del mel y entonces no vuelve a pasar el encoder.
+    """
+    return model.embed_audio(mel.unsqueeze(0))[0]
+
+
+def decode_windows(model, mels, decode_options, language=None, prompt=None):
+    """Decodificar un lote de ventanas mel [B, n_mels, N_FRAMES] con reintentos por temperatura.
+
+    En lugar de mels se pueden pasar salidas del encoder [B, n_audio_ctx, n_audio_state].
+    Sigue las mismas reglas que model.transcribe (compression_ratio_threshold,
+    logprob_threshold, silencio) pero sin marcas de tiempo: cada ventana da un solo texto.
+    Las ventanas que necesitan reintento se vuelven a decodificar juntas con la siguiente
+    temperatura. Devuelve una lista de textos (vacío = silencio).
+    """
+    temperature = decode_options.get("temperature", 0.0)
+    temperatures = [temperature] if isinstance(temperature, (int, float)) else list(temperature)
+    compression_ratio_threshold = decode_options.get("compression_ratio_threshold")
+    logprob_threshold = decode_options.get("logprob_threshold")
+    base_options = {"language": language, "without_timestamps": True, "fp16": False}
+    if decode_options.get("condition_on_previous_text") and prompt:
+        base_options["prompt"] = prompt
+
+    results = [None] * mels.shape[0]
+    remaining = list(range(mels.shape[0]))
+    for t in temperatures:
+        options = dict(base_options, temperature=t)
+        if t > 0:
+            options["best_of"] = decode_options.get("best_of")
+        else:
+            options["beam_size"] = decode_options.get("beam_size")
+        decoded = model.decode(mels[remaining], whisper.DecodingOptions(**options))
+        retry = []
+        for i, result in zip(remaining, decoded):
+            results[i] = result
+            needs_fallback = (
+                (compression_ratio_threshold is not None
+                 and result.compression_ratio > compression_ratio_threshold)
+                or (logprob_threshold is not None and result.avg_logprob < logprob_threshold)
+            )
+            if (logprob_threshold is not None and result.avg_logprob < logprob_threshold
+                    and result.no_speech_prob > NO_SPEECH_THRESHOLD):
+                needs_fallback = False  # silencio
+            if needs_fallback:
+                retry.append(i)
+        remaining = retry
+        if not remaining:
+            break
+
+    texts = []
+    for result in results:
+        silent = (
+            logprob_threshold is not None
+            and result.no_speech_prob > NO_SPEECH_THRESHOLD
+            and result.avg_logprob < logprob_threshold
+        )
+        texts.append("" if silent else result.text.strip())
+    return texts
+
+
+class _WindowRequest:
+    """Una ventana pendiente de decodificar y el Future por el que vuelve su texto."""
+
+    __slots__ = ("mel", "decode_options", "language", "future")
+
+    def __init__(self, mel, decode_options, language):
+        self.mel = mel
+        self.decode_options = decode_options
+        self.language = language
+        self.future = Future()
+
+
+class WindowBatcher:
+    """Agrupa ventanas mel de uno o varios trabajos y las decodifica en lote.
+
+    Un hilo por modelo espera la primera ventana, junta más hasta max_batch o hasta que
+    pasan max_wait segundos, y las decodifica juntas (las que comparten opciones, idioma
+    y forma van en el mismo lote). Cada submit devuelve un Future con el texto de su ventana.
+    """
+
+    def __init__(self, model, max_batch=None, max_wait=None):
+        self.model = model
+        self.max_batch = max_batch or config.BATCH_MAX_SIZE
+        self.max_wait = config.BATCH_MAX_WAIT_MS / 1000.0 if max_wait is None else max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, mel, decode_options, language=None):
+        """Encolar una ventana [n_mels, N_FRAMES]; devuelve un Future con su texto."""
+        request = _WindowRequest(mel, decode_options, language)
+        self._queue.put(request)
+        return request.future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for request in self._collect():
+                # Mismas opciones, idioma y forma (ventanas mel o salidas del encoder)
+                key = (repr(sorted(request.decode_options.items())), request.language,
+                       tuple(request.mel.shape))
+                groups.setdefault(key, []).append(request)
+            for requests in groups.values():
+                try:
+                    mels = torch.stack([r.mel for r in requests])
+                    with model_lock(self.model):
+                        texts = decode_windows(self.model, mels, requests[0].decode_options,
+                                               requests[0].language)
+                    for request, text in zip(requests, texts):
+                        request.future.set_result(text)
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+
+
+def get_batcher(model):
+    """WindowBatcher compartido por todos los trabajos que usan este modelo."""
+    with _registry_lock:
+        batcher = _batchers.get(id(model))
+        if batcher is None:
+            batcher = _batchers[id(model)] = WindowBatcher(model)
+        return batcher
+
+
+class EncoderCache:
+    """Caché en disco de salidas del encoder, una por ventana: <dir>/<modelo>/<hash>.npy.
+
+    Se guarda en float16 (la mitad de espacio). Al superar max_bytes se borran primero las
+    entradas usadas hace más tiempo (cada acierto actualiza la fecha del archivo).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".npy"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def _path(self, model_key, digest):
+        return os.path.join(self.directory, model_key, f"{digest}.npy")
+
+    def get(self, model_key, digest, device=None):
+        """Tensor float32 guardado o None."""
+        path = self._path(model_key, digest)
+        try:
+            features = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return torch.from_numpy(features.astype(np.float32)).to(device)
+
+    def put(self, model_key, digest, features):
+        """Guardar (escritura atómica) y desalojar lo más antiguo si se pasa del límite."""
+        path = self._path(model_key, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, features.detach().cpu().numpy().astype(np.float16))
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self._size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+
+_encoder_cache = None
+
+
+def get_encoder_cache():
+    """EncoderCache configurado (ENCODER_CACHE_DIR, ENCODER_CACHE_MAX_MB), creado una vez."""
+    global _encoder_cache
+    with _registry_lock:
+        if _encoder_cache is None:
+            _encoder_cache = EncoderCache(config.ENCODER_CACHE_DIR, config.ENCODER_CACHE_MAX_MB * 1024 * 1024)
+        return _encoder_cache
@@ -0,0 +1,190 @@
+"""
+Recepción de archivos subidos para MinutaAI
+
+Werkzeug guarda por defecto cada archivo de un formulario multipart en un temporal y
+file.save() lo vuelve a copiar a UPLOAD_FOLDER: cada byte se escribe dos veces. Con
+IngestRequest el cuerpo se escribe una sola vez, directamente en UPLOAD_FOLDER, y a la vez
+se calcula su SHA-256 y se revisa la cabecera del contenedor. Un archivo que no es audio
+ni video admitido (o un WAV sin muestras) se rechaza con los primeros KB, sin guardar el resto.
+"""
+
+import os
+import uuid
+import struct
+import hashlib
+
+from flask import Request, current_app
+
+from config import get_config
+
+config = get_config()
+
+# Bytes del inicio del archivo que se revisan antes de aceptar el resto
+HEADER_BYTES = 4096
+
+
+class UnsupportedMedia(Exception):
+    """El archivo subido no es un audio/video admitido o no tiene duración."""
+
+
+def sniff_container(header):
+    """Tipo de contenedor según los primeros bytes ('wav', 'mp3', 'mp4'...) o None si no se reconoce."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"RIFF" and header[8:12] == b"AVI ":
+        return "avi"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"  # mkv, webm
+    if header[:16] == b"\x30\x26\xb2\x75\x8e\x66\xcf\x11\xa6\xd9\x00\xaa\x00\x62\xce\x6c":
+        return "asf"  # wma, wmv
+    if header[:3] == b"FLV":
+        return "flv"
+    if header[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+        return "mp4"  # mp4, m4a, m4v, mov
+    if header[:3] == b"ID3":
+        return "mp3"  # etiqueta ID3 (mp3, a veces aac o flac)
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        return "mp3"  # sincronía de trama MPEG (mp3) o ADTS (aac)
+    if header[:4] == b"ADIF":
+        return "aac"
+    return None
+
+
+def wav_is_empty(header):
+    """True si la cabecera WAV declara un bloque 'data' vacío y el archivo termina ahí.
+
+    Los WAV escritos en streaming dejan los tamaños a 0 o 0xFFFFFFFF; solo se rechaza
+    si el tamaño RIFF confirma que no hay nada después de la cabecera.
+    """
+    riff_size = struct.unpack_from("<I", header, 4)[0]
+    pos = 12
+    while pos + 8 <= len(header):
+        chunk_id = header[pos:pos + 4]
+        size = struct.unpack_from("<I", header, pos + 4)[0]
+        if chunk_id == b"data":
+            # riff_size cuenta desde el byte 8: == pos si el archivo acaba tras esta cabecera
+            return size == 0 and riff_size == pos
+        pos += 8 + size + (size & 1)
+    return False
+
+
+class IngestFile:
+    """Destino de un archivo del formulario: escribe en UPLOAD_FOLDER, calcula el hash y revisa la cabecera.
+
+    Werkzeug lo usa como contenedor del archivo (write mientras llega el cuerpo, seek(0)
+    al terminar la parte). save_as lo mueve a su nombre final sin copiarlo. Si rejected tiene
+    un motivo, el resto de la parte se lee pero no se escribe.
+    """
+
+    def __init__(self, directory, filename=None):
+        os.makedirs(directory, exist_ok=True)
+        self.filename = filename
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.upload")
+        self.size = 0
+        self.container = None
+        self._file = open(self.path, "w+b")
+        self._hash = hashlib.sha256()
+        self._header = b""
+        self.rejected = None
+
+    def write(self, data):
+        if self.rejected is not None:
+            return len(data)
+        if self.container is None:
+            self._header += data[:HEADER_BYTES - len(self._header)]
+            if len(self._header) >= HEADER_BYTES:
+                self._check_header()
+                if self.rejected is not None:
+                    return len(data)
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def _check_header(self):
+        """Revisar la cabecera; si no es audio/video admitido, el motivo queda en rejected.
+
+        No se lanza la excepción aquí: en un formulario con varios archivos cortaría la lectura
+        de todos; la vista decide qué hacer con cada uno.
+        """
+        container = sniff_container(self._header) if self._header else None
+        if not self._header:
+            self.rejected = "El archivo está vacío"
+        elif container is None:
+            self.rejected = "El contenido no es un audio o video admitido"
+        elif container == "wav" and wav_is_empty(self._header):
+            self.rejected = "El WAV no contiene audio (duración 0)"
+        else:
+            self.container = container
+
+    def seek(self, offset, whence=0):
+        # Werkzeug llama a seek(0) al terminar la parte: archivos más cortos que HEADER_BYTES
+        if self.container is None and self.rejected is None:
+            self._check_header()
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def save_as(self, path):
+        """Mover el archivo recibido a path (mismo directorio: solo se renombra)."""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = None
+
+    def discard(self):
+        """Borrar el archivo si no se llegó a guardar (rechazado o error)."""
+        self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+
+class IngestRequest(Request):
+    """Request de Flask cuyos archivos subidos se escriben directamente con IngestFile."""
+
+    @property
+    def ingest_files(self):
+        return self.__dict__.setdefault("_ingest_files", [])
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename:
+            # Campo de archivo sin archivo seleccionado: lo resuelve la vista
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        stream = IngestFile(current_app.config["UPLOAD_FOLDER"], filename)
+        ext = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+        if ext not in config.get_allowed_extensions():
+            # No se guarda; la vista responde con su propio error (allowed_file)
+            stream.rejected = "File type not allowed"
+        self.ingest_files.append(stream)
+        return stream
+
+    def discard_files(self):
+        """Borrar lo recibido que no se haya guardado con save_as."""
+        for stream in self.ingest_files:
+            stream.discard()
+
+    def close(self):
+        """Flask la llama al terminar la petición: lo que ninguna vista guardó se borra siempre,
+        también en rutas que no esperan archivos (si no, quedarían .upload huérfanos)."""
+        try:
+            super().close()
+        finally:
+            self.discard_files()
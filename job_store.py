@@ -0,0 +1,160 @@
+"""
+Estado compartido de trabajos para MinutaAI (modo producción)
+
+Con el servidor de desarrollo todo vive en un proceso: el diccionario jobs de app.py y un hilo
+por trabajo. Con varios procesos HTTP (gunicorn) y procesos de transcripción aparte
+(`minutaai worker`) ese diccionario no se comparte, así que con JOB_STORE los trabajos y los
+lotes se guardan en una base SQLite (modo WAL: lecturas concurrentes con una escritura).
+Los procesos HTTP crean los trabajos en cola y leen su estado; cada worker toma el más antiguo
+en cola, lo ejecuta con el pipeline de siempre y va guardando su estado. Los TXT siguen en
+UPLOAD_FOLDER, que tiene que ser el mismo (o un volumen compartido) para todos los procesos.
+"""
+
+import json
+import time
+import sqlite3
+from contextlib import closing
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    batch_id TEXT,
+    state TEXT NOT NULL,          -- held (lote sin liberar), queued, running, finished
+    worker TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    run_args TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class JobStore:
+    """Trabajos y lotes en una base SQLite compartida entre procesos.
+
+    Cada llamada abre su propia conexión, así que se puede usar desde cualquier hilo o proceso
+    (también después de un fork de gunicorn).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def add_job(self, job_id, job, run_args, held=False):
+        """Guardar un trabajo nuevo en cola (held: espera a release_batch)."""
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, batch_id, state, created, updated, run_args, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job.get("batch_id"), "held" if held else "queued", now, now,
+                 json.dumps(run_args), json.dumps(job)),
+            )
+
+    def get_job(self, job_id):
+        """Estado del trabajo (dict), o None si no existe."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_jobs(self, job_ids):
+        """{job_id: estado} de los trabajos que existen."""
+        job_ids = list(job_ids)
+        found = {}
+        with closing(self._connect()) as db:
+            # De 500 en 500: límite de parámetros de SQLite
+            for start in range(0, len(job_ids), 500):
+                part = job_ids[start:start + 500]
+                rows = db.execute(
+                    f"SELECT job_id, data FROM jobs WHERE job_id IN ({','.join('?' * len(part))})", part)
+                found.update((job_id, json.loads(data)) for job_id, data in rows)
+        return found
+
+    def update_job(self, job_id, job):
+        """Guardar el estado actual de un trabajo en curso (también sirve de latido del worker)."""
+        state = "running" if job.get("status") == "processing" else "finished"
+        with closing(self._connect()) as db:
+            db.execute("UPDATE jobs SET data = ?, state = ?, updated = ? WHERE job_id = ?",
+                       (json.dumps(job), state, time.time(), job_id))
+
+    def heartbeat(self, job_ids):
+        """Marcar como vivos los trabajos en curso de un worker sin reescribir su estado."""
+        job_ids = list(job_ids)
+        with closing(self._connect()) as db:
+            db.execute(f"UPDATE jobs SET updated = ? WHERE state = 'running' AND job_id IN "
+                       f"({','.join('?' * len(job_ids))})", [time.time()] + job_ids)
+
+    def active_count(self, exclude_job_id=None):
+        """Trabajos que se están transcribiendo ahora (sin los que esperan en cola)."""
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'running' AND job_id != ?",
+                              (exclude_job_id or "",)).fetchone()[0]
+
+    def claim_job(self, worker):
+        """Tomar el trabajo más antiguo en cola para worker. (job_id, estado, run_args) o None."""
+        with closing(self._connect()) as db:
+            # BEGIN IMMEDIATE: dos workers no pueden tomar el mismo trabajo
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT job_id, run_args, data FROM jobs WHERE state = 'queued' "
+                             "ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            job_id, run_args, data = row
+            job = json.loads(data)
+            job["step"] = "splitting"
+            db.execute("UPDATE jobs SET state = 'running', worker = ?, updated = ?, data = ? WHERE job_id = ?",
+                       (worker, time.time(), json.dumps(job), job_id))
+            db.execute("COMMIT")
+        return job_id, job, json.loads(run_args)
+
+    def requeue_stale(self, stale_seconds):
+        """Volver a poner en cola los trabajos de workers que dejaron de dar señales. Devuelve cuántos."""
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("SELECT job_id, data FROM jobs WHERE state = 'running' AND updated < ?",
+                              (time.time() - stale_seconds,)).fetchall()
+            for job_id, data in rows:
+                job = json.loads(data)
+                job.update(step="queued", current_chunk=0, chunks=[])
+                db.execute("UPDATE jobs SET state = 'queued', worker = NULL, data = ? WHERE job_id = ?",
+                           (json.dumps(job), job_id))
+            db.execute("COMMIT")
+        return len(rows)
+
+    def add_batch(self, batch_id, batch):
+        """Guardar (o reemplazar) el resumen de un lote: job_ids, rechazados, modelo..."""
+        with closing(self._connect()) as db:
+            db.execute("INSERT OR REPLACE INTO batches (batch_id, data) VALUES (?, ?)",
+                       (batch_id, json.dumps(batch)))
+
+    def get_batch(self, batch_id):
+        """Resumen del lote (dict), o None si no existe."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT data FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def release_batch(self, batch_id, model_name):
+        """Poner en cola los trabajos retenidos del lote, todos con model_name."""
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("SELECT job_id, data FROM jobs WHERE batch_id = ? AND state = 'held'",
+                              (batch_id,)).fetchall()
+            for job_id, data in rows:
+                job = json.loads(data)
+                job["batch_model"] = model_name
+                db.execute("UPDATE jobs SET state = 'queued', data = ? WHERE job_id = ?",
+                           (json.dumps(job), job_id))
+            db.execute("COMMIT")
@@ -0,0 +1,122 @@
+"""
+Sondeo de archivos multimedia para MinutaAI
+
+Un único paso que devuelve la duración, el contenedor, el códec, la frecuencia de muestreo,
+los canales y las pistas del archivo. El trabajo lo guarda (job["media"]) y las etapas
+siguientes lo reutilizan en lugar de volver a abrir el archivo con MoviePy. WAV, y FLAC/OGG
+con soundfile, se leen de la cabecera; el resto con una llamada a `ffmpeg -i`, que lee la
+cabecera del contenedor sin decodificar nada. El coste queda en probe_ms.
+"""
+
+import re
+import time
+import wave
+import subprocess
+from collections import namedtuple
+
+import imageio_ffmpeg
+
+from direct_audio import pcm16k_wav_data, load_soundfile
+
+# Resultado del sondeo. streams: [{'index': '0:1', 'type': 'audio', 'codec': 'aac', ...}];
+# codec/sample_rate/channels son los de la primera pista de audio (None si no hay);
+# method: 'header' (sin procesos) o 'ffmpeg'
+MediaInfo = namedtuple("MediaInfo", [
+    "duration", "container", "codec", "sample_rate", "channels", "streams", "method", "probe_ms",
+])
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_INPUT_RE = re.compile(r"^Input #0, (.+?), from ", re.M)
+_STREAM_RE = re.compile(r"^\s*Stream #(\d+:\d+)\S*: (\w+): (.*)$", re.M)
+_CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "3.0": 3, "quad": 4, "4.0": 4, "5.0": 5,
+                    "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+def _channels(text):
+    """Número de canales a partir del texto de FFmpeg ('stereo', '5.1(side)', '3 channels')."""
+    match = re.match(r"(\d+) channels", text)
+    if match:
+        return int(match.group(1))
+    return _CHANNEL_LAYOUTS.get(text.split("(")[0])
+
+
+def _probe_header(path):
+    """(duración, contenedor, códec, frecuencia, canales) leyendo solo la cabecera; None si no se puede."""
+    try:
+        with wave.open(path, "rb") as wav:
+            channels, width, rate, frames = (wav.getnchannels(), wav.getsampwidth(),
+                                             wav.getframerate(), wav.getnframes())
+    except (wave.Error, EOFError, OSError):
+        pass
+    else:
+        data = pcm16k_wav_data(path)
+        if data:
+            frames = data[1] // 2  # WAV en streaming: el tamaño real, no el de la cabecera
+        if frames > 0:
+            codec = "pcm_u8" if width == 1 else f"pcm_s{8 * width}le"
+            return frames / rate, "wav", codec, rate, channels
+
+    soundfile = load_soundfile()
+    if soundfile is not None:
+        try:
+            info = soundfile.info(path)
+        except RuntimeError:
+            return None
+        if info.format in ("FLAC", "OGG") and info.frames > 0:
+            codec = "flac" if info.format == "FLAC" else info.subtype.lower()
+            return info.frames / info.samplerate, info.format.lower(), codec, info.samplerate, info.channels
+    return None
+
+
+def _parse_ffmpeg_info(output):
+    """Duración, contenedor y pistas a partir de la salida de `ffmpeg -i`. None si no es multimedia."""
+    container = _INPUT_RE.search(output)
+    if not container:
+        return None
+    duration = None
+    match = _DURATION_RE.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    streams = []
+    for index, kind, details in _STREAM_RE.findall(output):
+        fields = [f.strip() for f in re.split(r",(?![^(]*\))", details)]
+        stream = {"index": index, "type": kind.lower(), "codec": fields[0].split(" ")[0]}
+        if stream["type"] == "audio":
+            for field in fields[1:]:
+                if field.endswith(" Hz"):
+                    stream["sample_rate"] = int(field[:-3])
+                elif stream.get("channels") is None and _channels(field):
+                    stream["channels"] = _channels(field)
+        streams.append(stream)
+    return duration, container.group(1), streams
+
+
+def probe_media(path):
+    """Sondear path una sola vez. MediaInfo, o None si no es un archivo multimedia legible."""
+    start = time.perf_counter()
+    header = _probe_header(path)
+    if header:
+        duration, container, codec, sample_rate, channels = header
+        streams = [{"index": "0:0", "type": "audio", "codec": codec,
+                    "sample_rate": sample_rate, "channels": channels}]
+        method = "header"
+    else:
+        result = subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", path],
+            capture_output=True, text=True, errors="replace", timeout=60,
+        )
+        parsed = _parse_ffmpeg_info(result.stderr)
+        if parsed is None:
+            return None
+        duration, container, streams = parsed
+        audio = next((s for s in streams if s["type"] == "audio"), {})
+        codec, sample_rate, channels = audio.get("codec"), audio.get("sample_rate"), audio.get("channels")
+        method = "ffmpeg"
+    probe_ms = round((time.perf_counter() - start) * 1000, 1)
+    return MediaInfo(duration, container, codec, sample_rate, channels, streams, method, probe_ms)
+
+
+def has_audio(info):
+    """True si el archivo sondeado tiene al menos una pista de audio."""
+    return any(s["type"] == "audio" for s in info.streams)
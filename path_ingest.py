@@ -0,0 +1,75 @@
+"""
+Ingesta de archivos que ya están en el servidor para MinutaAI
+
+Las grabaciones que viven en un almacenamiento compartido (p. ej. un NAS montado) no tienen
+que volver a subirse por HTTP: /upload/path recibe la ruta y watch_folder.py recoge los
+archivos nuevos de una carpeta. Solo se aceptan rutas dentro de INGEST_ROOTS. El archivo no
+se copia a UPLOAD_FOLDER: se enlaza (enlace duro o reflink, si el sistema de archivos lo
+permite) o se lee en su sitio.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from config import get_config
+
+config = get_config()
+
+# ioctl FICLONE de Linux: copia por referencia (btrfs, XFS, ...); los bloques se comparten
+FICLONE = 0x40049409
+
+
+class PathNotAllowed(Exception):
+    """La ruta no se puede ingerir (fuera de INGEST_ROOTS, no existe o tipo no admitido)."""
+
+    def __init__(self, message, status=403):
+        super().__init__(message)
+        self.status = status
+
+
+def resolve_ingest_path(path, roots=None):
+    """Ruta real de path si es un archivo admitido dentro de roots (por defecto INGEST_ROOTS)."""
+    roots = config.INGEST_ROOTS if roots is None else roots
+    if not roots:
+        raise PathNotAllowed("La ingesta por ruta está desactivada (INGEST_ROOTS)")
+    if not path:
+        raise PathNotAllowed("path es obligatorio", 400)
+    # realpath: los enlaces simbólicos y los '..' no sacan la ruta de los directorios permitidos
+    real = os.path.realpath(path)
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([real, root]) == root:
+            break
+    else:
+        raise PathNotAllowed("La ruta no está dentro de INGEST_ROOTS")
+    if not os.path.isfile(real):
+        raise PathNotAllowed("El archivo no existe", 404)
+    ext = real.rsplit(".", 1)[1].lower() if "." in os.path.basename(real) else ""
+    if ext not in config.get_allowed_extensions():
+        raise PathNotAllowed("File type not allowed", 400)
+    return real
+
+
+def link_into(src, dest):
+    """Poner src en dest sin copiar los datos. Devuelve 'hardlink', 'reflink' o None.
+
+    None: src está en otro sistema de archivos sin reflink; el trabajo lo lee en su sitio.
+    """
+    try:
+        os.link(src, dest)
+        return "hardlink"
+    except OSError:
+        pass
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as s, open(dest, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return "reflink"
+        except OSError:
+            if os.path.exists(dest):
+                os.remove(dest)
+    return None
@@ -67,7 +67,8 @@ def start_server():
     print("-" * 40)
     
     try:
-        from app import app
+        from app import app, setup_server
+        setup_server()
         app.run(debug=True, host='0.0.0.0', port=5000)
     except KeyboardInterrupt:
         print("\n👋 Servidor detenido")
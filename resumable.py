@@ -0,0 +1,246 @@
+"""
+Subidas reanudables para MinutaAI (estilo tus)
+
+El cliente crea una sesión con el nombre y el tamaño del archivo, envía el contenido por
+trozos (cada PATCH indica en Upload-Offset dónde empieza) y, cuando el offset llega al
+tamaño, la finaliza en un trabajo de transcripción. Si la conexión se corta, pregunta el
+offset y sigue desde ahí. El archivo solo crece por el final (append), así que lo recibido
+nunca se vuelve a escribir. Las sesiones viven en disco (UPLOAD_FOLDER/resumable) y
+sobreviven a un reinicio del servidor.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from config import get_config
+from ingest import HEADER_BYTES, UnsupportedMedia, sniff_container, wav_is_empty
+
+config = get_config()
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Un lock por sesión: dos PATCH a la vez sobre el mismo archivo se serializan (entre procesos,
+# además, con flock sobre <id>.lock; ver ResumableUpload._lock)
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class UploadNotFound(Exception):
+    """La sesión no existe (o caducó)."""
+
+
+class OffsetMismatch(Exception):
+    """El Upload-Offset del cliente no coincide con lo recibido; offset = el correcto."""
+
+    def __init__(self, offset):
+        super().__init__(f"Offset incorrecto; el servidor tiene {offset} bytes")
+        self.offset = offset
+
+
+class ResumableUpload:
+    """Una sesión de subida: <id>.part (contenido recibido) y <id>.json (nombre, tamaño, opciones)."""
+
+    def __init__(self, upload_id, directory, meta):
+        self.id = upload_id
+        self.directory = directory
+        self.meta = meta
+
+    @staticmethod
+    def _directory():
+        return os.path.join(config.UPLOAD_FOLDER, "resumable")
+
+    @property
+    def part_path(self):
+        return os.path.join(self.directory, f"{self.id}.part")
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, f"{self.id}.json")
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.directory, f"{self.id}.lock")
+
+    @property
+    def size(self):
+        return self.meta["size"]
+
+    @property
+    def filename(self):
+        return self.meta["filename"]
+
+    @property
+    def options(self):
+        return self.meta["options"]
+
+    @property
+    def offset(self):
+        """Bytes recibidos (el tamaño del .part)."""
+        try:
+            return os.path.getsize(self.part_path)
+        except OSError:
+            return 0
+
+    @classmethod
+    def create(cls, filename, size, options):
+        """Nueva sesión vacía. options: opciones del trabajo (perfil, idioma...) ya validadas."""
+        directory = cls._directory()
+        os.makedirs(directory, exist_ok=True)
+        cls.remove_expired()
+        upload = cls(uuid.uuid4().hex, directory, {
+            "filename": filename,
+            "size": size,
+            "options": options,
+            "created": time.time(),
+        })
+        open(upload.part_path, "wb").close()
+        with open(upload.meta_path, "w", encoding="utf-8") as f:
+            json.dump(upload.meta, f)
+        return upload
+
+    @classmethod
+    def load(cls, upload_id):
+        """Sesión existente. UploadNotFound si el id no es válido o no existe."""
+        if not _ID_RE.match(upload_id or ""):
+            raise UploadNotFound(upload_id)
+        directory = cls._directory()
+        try:
+            with open(os.path.join(directory, f"{upload_id}.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise UploadNotFound(upload_id)
+        return cls(upload_id, directory, meta)
+
+    @contextmanager
+    def _lock(self):
+        """Exclusión sobre la sesión entre hilos y, con fcntl, entre procesos.
+
+        Con varios procesos HTTP (gunicorn) dos PATCH de la misma subida pueden llegar a
+        procesos distintos; el lock en memoria no basta. UploadNotFound si otro la finalizó
+        o la borró mientras se esperaba.
+        """
+        with _locks_lock:
+            thread_lock = _locks.setdefault(self.id, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    if not os.path.exists(self.meta_path):
+                        # Abrir el lock lo vuelve a crear: no dejarlo huérfano
+                        try:
+                            os.remove(self.lock_path)
+                        except OSError:
+                            pass
+                        raise UploadNotFound(self.id)
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def append(self, stream, offset, buffer_size=1024 * 1024):
+        """Añadir al final lo que llega por stream, empezando en offset. Devuelve el nuevo offset.
+
+        OffsetMismatch si offset no es lo ya recibido; UnsupportedMedia si la cabecera del
+        archivo no es de un audio/video admitido o si se envía más que el tamaño declarado.
+        Si la conexión se corta a mitad, lo recibido hasta ahí se conserva.
+        """
+        with self._lock():
+            current = self.offset
+            if offset != current:
+                raise OffsetMismatch(current)
+            with open(self.part_path, "ab") as f:
+                while True:
+                    data = stream.read(buffer_size)
+                    if not data:
+                        break
+                    if current + len(data) > self.size:
+                        raise UnsupportedMedia("Se envió más contenido que el tamaño declarado")
+                    if current < HEADER_BYTES:
+                        # Primeros KB: revisar la cabecera antes de aceptar el resto
+                        f.write(data)
+                        f.flush()
+                        current += len(data)
+                        self.check_header(final=current >= self.size)
+                        continue
+                    f.write(data)
+                    current += len(data)
+            return current
+
+    def check_header(self, final=True):
+        """Revisar la cabecera con lo recibido (final=False: esperar a tener HEADER_BYTES)."""
+        with open(self.part_path, "rb") as f:
+            header = f.read(HEADER_BYTES)
+        if len(header) < HEADER_BYTES and not final:
+            return
+        if not header:
+            raise UnsupportedMedia("El archivo está vacío")
+        container = sniff_container(header)
+        if container is None:
+            raise UnsupportedMedia("El contenido no es un audio o video admitido")
+        if container == "wav" and wav_is_empty(header):
+            raise UnsupportedMedia("El WAV no contiene audio (duración 0)")
+
+    def finalize(self, path):
+        """Mover el archivo completo a path y borrar la sesión. Devuelve su SHA-256."""
+        with self._lock():
+            self.check_header()
+            sha256 = hashlib.sha256()
+            with open(self.part_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    sha256.update(block)
+            os.replace(self.part_path, path)
+            self.remove()
+        return sha256.hexdigest()
+
+    def cancel(self):
+        """Borrar la sesión esperando a que acabe un PATCH o finalize en curso (de este u otro proceso)."""
+        try:
+            with self._lock():
+                self.remove()
+        except UploadNotFound:
+            pass  # Ya la finalizó o la borró otra petición
+
+    def remove(self):
+        """Borrar la sesión y lo recibido."""
+        for path in (self.part_path, self.meta_path, self.lock_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with _locks_lock:
+            _locks.pop(self.id, None)
+
+    @classmethod
+    def remove_expired(cls):
+        """Borrar sesiones sin actividad desde hace RESUMABLE_UPLOAD_TTL_HOURS."""
+        directory = cls._directory()
+        limit = time.time() - config.RESUMABLE_UPLOAD_TTL_HOURS * 3600
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            upload_id, ext = os.path.splitext(name)
+            if ext != ".json" or not _ID_RE.match(upload_id):
+                continue
+            upload = cls(upload_id, directory, {})
+            try:
+                last_activity = max(os.path.getmtime(p) for p in (upload.part_path, upload.meta_path)
+                                    if os.path.exists(p))
+            except ValueError:
+                continue
+            if last_activity < limit:
+                upload.remove()
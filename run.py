@@ -92,8 +92,9 @@ def main():
     
     # Ejecutar aplicación
     try:
-        from app import app
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        from app import app, config, setup_server
+        setup_server()
+        app.run(debug=config.DEBUG, host=config.HOST, port=config.PORT)
     except KeyboardInterrupt:
         print("\n👋 Servidor detenido")
     except Exception as e:
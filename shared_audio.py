@@ -0,0 +1,155 @@
+"""
+Audio compartido entre procesos para MinutaAI
+
+El audio decodificado de un trabajo (PCM 16kHz mono int16) se copia una sola vez a un bloque
+de multiprocessing.shared_memory; los procesos de inferencia leen su rango de muestras
+directamente de ese bloque, sin que el audio pase por pipes ni pickle.
+"""
+
+import math
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import get_config
+
+config = get_config()
+
+# Referencia a un chunk dentro de un bloque compartido (lo único que viaja al proceso de inferencia)
+SharedChunk = namedtuple("SharedChunk", ["shm_name", "n_samples", "start", "end"])
+
+# Modelos cargados en cada proceso de inferencia (nombre -> modelo)
+_worker_models = {}
+
+
+def pcm_to_float32(pcm):
+    """int16 -> float32 en [-1, 1], una sola asignación (solo del chunk que se va a usar)."""
+    return np.multiply(pcm, 1.0 / 32768.0, dtype=np.float32)
+
+
+def is_silent(audio):
+    """True si el chunk está por debajo de los umbrales de silencio (RMS o pico)."""
+    if audio.size == 0:
+        return True
+    rms = math.sqrt(float(np.dot(audio, audio)) / audio.size)
+    peak = max(float(audio.max()), -float(audio.min()))
+    return rms < config.SILENCE_RMS_THRESHOLD or peak < config.SILENCE_PEAK_THRESHOLD
+
+
+def language_probs(audio, model):
+    """Probabilidad de cada idioma para un chunk float32 (usa solo los primeros 30 s)."""
+    import whisper
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return probs
+
+
+class SharedPcm:
+    """Bloque de memoria compartida con el PCM int16 de un trabajo."""
+
+    def __init__(self, shm, n_samples):
+        self.shm = shm
+        self.n_samples = n_samples
+
+    @classmethod
+    def from_file(cls, pcm_path, offset=0, size=None):
+        """Crear el bloque y leer el PCM directamente en él (sin copias intermedias).
+
+        offset/size: las muestras están dentro de otro archivo (el bloque 'data' de un WAV).
+        """
+        with open(pcm_path, "rb", buffering=0) as f:
+            if size is None:
+                size = f.seek(0, 2) - offset
+            f.seek(offset)
+            shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            try:
+                view = shm.buf
+                pos = 0
+                while pos < size:
+                    n = f.readinto(view[pos:size])
+                    if not n:
+                        break
+                    pos += n
+                del view
+            except Exception:
+                shm.close()
+                shm.unlink()
+                raise
+        return cls(shm, pos // 2)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def chunks(self, chunk_duration, sample_rate=16000):
+        """Referencias SharedChunk de chunk_duration segundos que cubren todo el audio."""
+        step = int(chunk_duration * sample_rate)
+        return [
+            SharedChunk(self.name, self.n_samples, start, min(start + step, self.n_samples))
+            for start in range(0, self.n_samples, step)
+        ]
+
+    def release(self):
+        """Cerrar y liberar el bloque (llamar una vez, cuando el trabajo termina)."""
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _attach(chunk):
+    """Abrir el bloque del chunk y devolver (shm, vista int16 del rango). Sin copiar."""
+    shm = shared_memory.SharedMemory(name=chunk.shm_name)
+    samples = np.ndarray((chunk.n_samples,), dtype=np.int16, buffer=shm.buf)
+    return shm, samples[chunk.start:chunk.end]
+
+
+def _get_worker_model(model_name):
+    """Cargar el modelo una vez por proceso de inferencia (backend y precisión configurados)."""
+    from backends import get_backend
+    model = _worker_models.get(model_name)
+    if model is None:
+        model = get_backend().load(model_name)
+        _worker_models[model_name] = model
+    return get_backend(), model
+
+
+def transcribe_shared_chunk(chunk, model_name, decode_options):
+    """Proceso de inferencia: transcribir un SharedChunk. Devuelve {"text", "skipped"}."""
+    shm, pcm = _attach(chunk)
+    try:
+        # Mismo criterio que transcribe_chunks con archivos: menos de 1000 bytes no se transcribe
+        if pcm.nbytes < 1000:
+            return {"text": "", "skipped": True}
+        audio = pcm_to_float32(pcm)
+    finally:
+        del pcm
+        shm.close()
+    if config.SILENCE_CHECK and is_silent(audio):
+        return {"text": "", "skipped": True}
+    backend, model = _get_worker_model(model_name)
+    return {"text": backend.transcribe_window(model, audio, decode_options), "skipped": False}
+
+
+def detect_language_shared(chunks, model_name, max_chunks):
+    """Proceso de inferencia: sumar probabilidades de idioma de los primeros chunks con audio."""
+    totals = {}
+    used = 0
+    for chunk in chunks:
+        if used >= max_chunks:
+            break
+        shm, pcm = _attach(chunk)
+        try:
+            audio = pcm_to_float32(pcm)
+        finally:
+            del pcm
+            shm.close()
+        if audio.size < 500 or (config.SILENCE_CHECK and is_silent(audio)):
+            continue
+        backend, model = _get_worker_model(model_name)
+        for lang, p in backend.language_probs(model, audio).items():
+            totals[lang] = totals.get(lang, 0.0) + p
+        used += 1
+    return totals
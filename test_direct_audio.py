@@ -0,0 +1,52 @@
+"""
+Pruebas de la lectura directa de WAV 16kHz mono (direct_audio.py), sin FFmpeg
+"""
+
+import wave
+import struct
+
+from direct_audio import pcm16k_wav_data, decode_direct
+
+
+def _write_wav(path, samples=1600, rate=16000, channels=1):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack(f"<{samples * channels}h", *range(samples * channels)))
+    return path
+
+
+def test_pcm16k_wav_data_points_at_samples(tmp_path):
+    """(offset, bytes) del bloque data: las muestras se leen tal cual del archivo."""
+    path = _write_wav(tmp_path / "a.wav")
+    offset, size = pcm16k_wav_data(str(path))
+    assert (offset, size) == (44, 3200)
+    data = path.read_bytes()[offset:offset + size]
+    assert struct.unpack("<1600h", data) == tuple(range(1600))
+
+
+def test_pcm16k_wav_data_other_formats(tmp_path):
+    """Otra frecuencia, estéreo o un archivo que no es WAV necesitan FFmpeg."""
+    assert pcm16k_wav_data(str(_write_wav(tmp_path / "b.wav", rate=44100))) is None
+    assert pcm16k_wav_data(str(_write_wav(tmp_path / "c.wav", channels=2))) is None
+    other = tmp_path / "d.wav"
+    other.write_bytes(b"no es un wav")
+    assert pcm16k_wav_data(str(other)) is None
+
+
+def test_pcm16k_wav_data_streaming_sizes(tmp_path):
+    """Con el tamaño de data a 0xFFFFFFFF las muestras llegan hasta el final del archivo."""
+    path = _write_wav(tmp_path / "a.wav")
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<I", data, 40, 0xFFFFFFFF)
+    data += b"\x01"  # byte suelto al final: no se cuenta media muestra
+    path.write_bytes(bytes(data))
+    assert pcm16k_wav_data(str(path)) == (44, 3200)
+
+
+def test_decode_direct_copies_pcm(tmp_path):
+    path = _write_wav(tmp_path / "a.wav")
+    pcm = tmp_path / "a.pcm"
+    assert decode_direct(str(path), str(pcm))
+    assert pcm.read_bytes() == path.read_bytes()[44:]
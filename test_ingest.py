@@ -0,0 +1,55 @@
+"""
+Pruebas de la revisión de cabeceras de ingest.py (sin modelo ni servidor)
+"""
+
+import io
+import wave
+import struct
+
+from ingest import sniff_container, wav_is_empty
+
+
+def _wav_bytes(samples=16000, rate=16000):
+    """WAV 16-bit mono con samples muestras de silencio."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * samples)
+    return buffer.getvalue()
+
+
+def test_sniff_container_known_headers():
+    """Cada firma se reconoce por sus primeros bytes."""
+    assert sniff_container(_wav_bytes()) == "wav"
+    assert sniff_container(b"RIFF\x00\x00\x00\x00AVI LIST") == "avi"
+    assert sniff_container(b"fLaC\x00\x00\x00\x22") == "flac"
+    assert sniff_container(b"OggS\x00\x02") == "ogg"
+    assert sniff_container(b"\x1a\x45\xdf\xa3\x01\x00") == "matroska"
+    assert sniff_container(b"\x00\x00\x00\x20ftypisom") == "mp4"
+    assert sniff_container(b"ID3\x04\x00\x00") == "mp3"
+    assert sniff_container(b"\xff\xfb\x90\x64") == "mp3"
+    assert sniff_container(b"FLV\x01") == "flv"
+
+
+def test_sniff_container_rejects_other_content():
+    """Texto, imágenes o una cabecera vacía no son audio ni video."""
+    assert sniff_container(b"") is None
+    assert sniff_container(b"hola, esto no es audio") is None
+    assert sniff_container(b"\x89PNG\r\n\x1a\n") is None
+    assert sniff_container(b"%PDF-1.7") is None
+
+
+def test_wav_is_empty():
+    """Solo un WAV cuyo RIFF confirma que no hay muestras es vacío."""
+    assert not wav_is_empty(_wav_bytes())
+    assert wav_is_empty(_wav_bytes(samples=0))
+
+
+def test_wav_is_empty_streaming_header():
+    """Tamaños a 0xFFFFFFFF (WAV escrito en streaming): no se rechaza."""
+    header = bytearray(_wav_bytes(samples=0))
+    struct.pack_into("<I", header, 4, 0xFFFFFFFF)
+    struct.pack_into("<I", header, 40, 0xFFFFFFFF)
+    assert not wav_is_empty(bytes(header))
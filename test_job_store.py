@@ -0,0 +1,97 @@
+"""
+Pruebas del estado compartido de trabajos (job_store.py) sobre una base SQLite temporal
+"""
+
+import pytest
+
+import job_store
+from job_store import JobStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(job_store.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def _add(store, clock, job_id, **job):
+    clock.now += 1
+    store.add_job(job_id, dict({"status": "processing", "step": "queued"}, **job), [job_id, "args"],
+                  held=bool(job.get("batch_id")))
+
+
+def test_claim_in_order_and_once(store, clock):
+    """Cada trabajo lo toma un solo worker, el más antiguo primero."""
+    for job_id in ("a", "b"):
+        _add(store, clock, job_id)
+    job_id, job, run_args = store.claim_job("w1")
+    assert (job_id, job["step"], run_args) == ("a", "splitting", ["a", "args"])
+    assert store.claim_job("w2")[0] == "b"
+    assert store.claim_job("w3") is None
+    assert store.active_count() == 2
+    assert store.active_count(exclude_job_id="a") == 1
+
+
+def test_held_batch_jobs_wait_for_release(store, clock):
+    _add(store, clock, "a", batch_id="lote")
+    assert store.claim_job("w1") is None
+    store.release_batch("lote", "small")
+    job_id, job, _ = store.claim_job("w1")
+    assert (job_id, job["batch_model"]) == ("a", "small")
+
+
+def test_finished_jobs_leave_running(store, clock):
+    _add(store, clock, "a")
+    _, job, _ = store.claim_job("w1")
+    store.update_job("a", dict(job, status="done"))
+    assert store.active_count() == 0
+    assert store.get_job("a")["status"] == "done"
+    assert store.requeue_stale(0) == 0
+
+
+def test_stale_jobs_are_requeued_unless_heartbeat(store, clock):
+    """Sin latido durante stale_seconds el trabajo vuelve a la cola; con latido, no."""
+    for job_id in ("a", "b"):
+        _add(store, clock, job_id)
+    store.claim_job("w1")
+    store.claim_job("w2")
+    clock.now += 100
+    store.heartbeat(["b"])
+    clock.now += 50
+    assert store.requeue_stale(120) == 1
+    assert store.get_job("a")["step"] == "queued"
+    assert store.get_job("b")["step"] == "splitting"
+    # El trabajo recuperado lo puede tomar otro worker
+    assert store.claim_job("w3")[0] == "a"
+
+
+def test_heartbeat_keeps_state(store, clock):
+    _add(store, clock, "a")
+    _, job, _ = store.claim_job("w1")
+    store.update_job("a", dict(job, current_chunk=3))
+    store.heartbeat(["a"])
+    assert store.get_job("a")["current_chunk"] == 3
+
+
+def test_batches_and_bulk_get(store, clock):
+    for i in range(600):
+        _add(store, clock, f"j{i}")
+    found = store.get_jobs([f"j{i}" for i in range(600)] + ["no_existe"])
+    assert len(found) == 600
+    assert store.get_batch("lote") is None
+    store.add_batch("lote", {"job_ids": ["j1"], "model": "base"})
+    assert store.get_batch("lote")["model"] == "base"
@@ -0,0 +1,55 @@
+"""
+Pruebas del sondeo de archivos (media_probe.py) sobre salidas de `ffmpeg -i` ya capturadas
+"""
+
+from media_probe import MediaInfo, _parse_ffmpeg_info, has_audio
+
+VIDEO_OUTPUT = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'junta.mp4':
+  Metadata:
+    major_brand     : isom
+  Duration: 01:02:03.50, start: 0.000000, bitrate: 165 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(progressive), 1280x720, 31 kb/s, 25 fps (default)
+      Metadata:
+        handler_name    : VideoHandler
+  Stream #0:1[0x2](und): Audio: aac (LC) (mp4a / 0x6134706D), 44100 Hz, stereo, fltp, 127 kb/s (default)
+      Metadata:
+        handler_name    : SoundHandler
+At least one output file must be specified
+"""
+
+SURROUND_OUTPUT = """\
+Input #0, matroska,webm, from 'pelicula.mkv':
+  Duration: 00:00:10.00, start: 0.000000, bitrate: 400 kb/s
+  Stream #0:0: Audio: ac3, 48000 Hz, 5.1(side), fltp, 384 kb/s
+  Stream #0:1(spa): Audio: opus, 48000 Hz, 3 channels, fltp
+"""
+
+
+def test_parse_video_with_audio():
+    duration, container, streams = _parse_ffmpeg_info(VIDEO_OUTPUT)
+    assert duration == 3723.5
+    assert container == "mov,mp4,m4a,3gp,3g2,mj2"
+    assert [(s["index"], s["type"], s["codec"]) for s in streams] == [("0:0", "video", "h264"), ("0:1", "audio", "aac")]
+    assert streams[1]["sample_rate"] == 44100
+    assert streams[1]["channels"] == 2
+
+
+def test_parse_channel_layouts():
+    """Disposiciones con nombre ('5.1(side)') y número explícito de canales."""
+    _, container, streams = _parse_ffmpeg_info(SURROUND_OUTPUT)
+    assert container == "matroska,webm"
+    assert [s["channels"] for s in streams] == [6, 3]
+    assert [s["sample_rate"] for s in streams] == [48000, 48000]
+
+
+def test_parse_not_media():
+    """Sin línea Input (archivo ilegible o que no es multimedia): None."""
+    assert _parse_ffmpeg_info("nota.txt: Invalid data found when processing input\n") is None
+
+
+def test_has_audio():
+    _, container, streams = _parse_ffmpeg_info(VIDEO_OUTPUT)
+    info = MediaInfo(3723.5, container, "aac", 44100, 2, streams, "ffmpeg", 1.0)
+    assert has_audio(info)
+    assert not has_audio(info._replace(streams=streams[:1]))
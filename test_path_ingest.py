@@ -0,0 +1,76 @@
+"""
+Pruebas de la ingesta por ruta (path_ingest.py): solo rutas dentro de las raíces permitidas
+"""
+
+import os
+import sys
+
+import pytest
+
+from path_ingest import PathNotAllowed, resolve_ingest_path, link_into
+
+
+@pytest.fixture
+def roots(tmp_path):
+    root = tmp_path / "nas"
+    outside = tmp_path / "privado"
+    root.mkdir()
+    outside.mkdir()
+    (root / "junta.wav").write_bytes(b"RIFF")
+    (outside / "secreto.wav").write_bytes(b"RIFF")
+    return root, outside
+
+
+def test_file_inside_root(roots):
+    root, _ = roots
+    assert resolve_ingest_path(str(root / "junta.wav"), [str(root)]) == os.path.realpath(root / "junta.wav")
+
+
+def test_dotdot_cannot_leave_root(roots):
+    root, _ = roots
+    with pytest.raises(PathNotAllowed) as excinfo:
+        resolve_ingest_path(str(root / ".." / "privado" / "secreto.wav"), [str(root)])
+    assert excinfo.value.status == 403
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="crear enlaces simbólicos requiere permisos en Windows")
+def test_symlink_cannot_leave_root(roots):
+    root, outside = roots
+    os.symlink(outside / "secreto.wav", root / "enlace.wav")
+    os.symlink(outside, root / "carpeta")
+    for path in (root / "enlace.wav", root / "carpeta" / "secreto.wav"):
+        with pytest.raises(PathNotAllowed) as excinfo:
+            resolve_ingest_path(str(path), [str(root)])
+        assert excinfo.value.status == 403
+
+
+def test_root_prefix_is_not_enough(roots, tmp_path):
+    """/nas2 no está dentro de /nas aunque empiece igual."""
+    root, _ = roots
+    sibling = tmp_path / "nas2"
+    sibling.mkdir()
+    (sibling / "otro.wav").write_bytes(b"RIFF")
+    with pytest.raises(PathNotAllowed):
+        resolve_ingest_path(str(sibling / "otro.wav"), [str(root)])
+
+
+def test_missing_empty_and_disallowed(roots):
+    root, _ = roots
+    (root / "notas.txt").write_text("hola")
+    cases = [("", 400), (str(root / "no_existe.wav"), 404), (str(root / "notas.txt"), 400)]
+    for path, status in cases:
+        with pytest.raises(PathNotAllowed) as excinfo:
+            resolve_ingest_path(path, [str(root)])
+        assert excinfo.value.status == status
+    with pytest.raises(PathNotAllowed):
+        resolve_ingest_path(str(root / "junta.wav"), [])
+
+
+def test_link_into_shares_data(roots, tmp_path):
+    """El enlace tiene el mismo contenido y borrarlo no toca el original."""
+    root, _ = roots
+    dest = tmp_path / "uploads.wav"
+    assert link_into(str(root / "junta.wav"), str(dest)) in ("hardlink", "reflink")
+    assert dest.read_bytes() == b"RIFF"
+    os.remove(dest)
+    assert (root / "junta.wav").exists()
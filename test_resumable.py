@@ -0,0 +1,91 @@
+"""
+Pruebas de las subidas reanudables (resumable.py), sobre un UPLOAD_FOLDER temporal
+"""
+
+import io
+import os
+import wave
+import hashlib
+
+import pytest
+
+import resumable
+from ingest import UnsupportedMedia
+from resumable import ResumableUpload, OffsetMismatch, UploadNotFound
+
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(resumable.config, "UPLOAD_FOLDER", str(tmp_path))
+    return tmp_path
+
+
+def _wav_bytes(samples=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\x01\x00" * samples)
+    return buffer.getvalue()
+
+
+def test_append_in_pieces_and_finalize(upload_folder):
+    """Los trozos se añaden en su offset y finalize mueve el archivo y devuelve su SHA-256."""
+    data = _wav_bytes()
+    upload = ResumableUpload.create("a.wav", len(data), {})
+    assert upload.offset == 0
+    assert upload.append(io.BytesIO(data[:10000]), 0) == 10000
+    assert ResumableUpload.load(upload.id).offset == 10000
+    assert upload.append(io.BytesIO(data[10000:]), 10000) == len(data)
+
+    target = upload_folder / "a.wav"
+    assert upload.finalize(str(target)) == hashlib.sha256(data).hexdigest()
+    assert target.read_bytes() == data
+    with pytest.raises(UploadNotFound):
+        ResumableUpload.load(upload.id)
+
+
+def test_offset_mismatch_reports_received_bytes(upload_folder):
+    """Un Upload-Offset que no es lo recibido se rechaza con el offset correcto (409 en la vista)."""
+    data = _wav_bytes()
+    upload = ResumableUpload.create("a.wav", len(data), {})
+    upload.append(io.BytesIO(data[:5000]), 0)
+    for offset in (0, 4000, 6000):
+        with pytest.raises(OffsetMismatch) as excinfo:
+            upload.append(io.BytesIO(data[offset:]), offset)
+        assert excinfo.value.offset == 5000
+    assert upload.offset == 5000
+
+
+def test_more_than_declared_size_is_rejected(upload_folder):
+    """Enviar más bytes que el tamaño declarado no se acepta."""
+    data = _wav_bytes()
+    upload = ResumableUpload.create("a.wav", len(data) - 100, {})
+    with pytest.raises(UnsupportedMedia):
+        upload.append(io.BytesIO(data), 0)
+
+
+def test_header_is_checked_with_first_bytes(upload_folder):
+    """Un archivo que no es audio ni video se rechaza con la cabecera."""
+    data = b"esto no es audio" * 1000
+    upload = ResumableUpload.create("a.wav", len(data), {})
+    with pytest.raises(UnsupportedMedia):
+        upload.append(io.BytesIO(data), 0)
+
+
+def test_cancel_removes_session(upload_folder):
+    """cancel borra la sesión; una segunda vez no falla."""
+    upload = ResumableUpload.create("a.wav", 100, {})
+    upload.cancel()
+    upload.cancel()
+    assert os.listdir(upload_folder / "resumable") == []
+    with pytest.raises(UploadNotFound):
+        ResumableUpload.load(upload.id)
+
+
+def test_load_rejects_invalid_ids(upload_folder):
+    with pytest.raises(UploadNotFound):
+        ResumableUpload.load("../../etc/passwd")
+    with pytest.raises(UploadNotFound):
+        ResumableUpload.load("0" * 32)
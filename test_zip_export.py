@@ -0,0 +1,49 @@
+"""
+Pruebas de la exportación en ZIP (zip_export.py): se genera sin seek y zipfile la puede leer
+"""
+
+import io
+import zipfile
+
+from zip_export import stream_zip, file_blocks
+
+
+def test_stream_zip_is_readable(tmp_path):
+    txt = tmp_path / "junta.txt"
+    txt.write_text("Buenos días a todos. " * 20000, encoding="utf-8")
+    entries = [
+        ("junta.txt", file_blocks(str(txt), block_size=4096)),
+        ("vacio.txt", []),
+        ("notas/ñandú.json", [b'{"a": ', b"1}"]),
+    ]
+    parts = list(stream_zip(entries, block_size=8192))
+    # Se entrega por partes, no todo al final
+    assert len(parts) > 2
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(parts))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["junta.txt", "vacio.txt", "notas/ñandú.json"]
+        assert archive.read("junta.txt") == txt.read_bytes()
+        assert archive.read("vacio.txt") == b""
+        assert archive.read("notas/ñandú.json") == b'{"a": 1}'
+
+
+def test_stream_zip_consumes_entries_lazily():
+    """Cada entrada se pide cuando toca, no todas al empezar."""
+    requested = []
+
+    def entries():
+        for i in range(3):
+            requested.append(i)
+            yield f"{i}.txt", [b"x" * 100]
+
+    stream = stream_zip(entries(), block_size=1)
+    next(stream)
+    assert requested == [0]
+    b"".join(stream)
+    assert requested == [0, 1, 2]
+
+
+def test_stream_zip_empty():
+    with zipfile.ZipFile(io.BytesIO(b"".join(stream_zip([])))) as archive:
+        assert archive.namelist() == []
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Carpeta vigilada de MinutaAI
+Recorre WATCH_FOLDER (y sus subcarpetas) cada WATCH_INTERVAL segundos y transcribe cada
+archivo de audio/video nuevo con el mismo pipeline que /upload, sin copiarlo (ver
+path_ingest). Un archivo se toma cuando lleva WATCH_SETTLE_SECONDS sin cambiar de tamaño
+ni de fecha, para no leer una grabación que todavía se está copiando. El TXT se escribe en
+WATCH_OUTPUT_FOLDER (por defecto junto al original) y lo ya procesado se recuerda en
+WATCH_STATE_FILE, así que al reiniciar no se repite nada.
+
+Uso:
+    python watch_folder.py /mnt/nas/grabaciones
+    python watch_folder.py /mnt/nas/grabaciones --output /mnt/nas/transcripciones --once
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from config import get_config
+
+config = get_config()
+
+
+class WatchFolder:
+    """Vigila una carpeta y lanza un trabajo por archivo nuevo.
+
+    submit(path, output_path) crea el trabajo y devuelve su job_id; job_status(job_id) devuelve
+    'processing', 'done', 'error' o None.
+    """
+
+    def __init__(self, folder, submit, job_status, output_folder=None, state_file=None,
+                 settle_seconds=None, max_active=None):
+        self.folder = os.path.realpath(folder)
+        self.submit = submit
+        self.job_status = job_status
+        self.output_folder = output_folder or config.WATCH_OUTPUT_FOLDER or None
+        self.state_file = state_file or config.WATCH_STATE_FILE
+        self.settle_seconds = config.WATCH_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.max_active = max_active or config.WATCH_MAX_ACTIVE
+        self.state = self._load_state()
+        self._seen = {}  # ruta -> (tamaño, mtime) en la pasada anterior
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Trabajos que estaban en curso cuando se paró el proceso: se repiten
+        return {path: entry for path, entry in state.items() if entry.get("status") != "processing"}
+
+    def _save_state(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.state_file)
+
+    def _output_path(self, path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.output_folder or os.path.dirname(path), f"{stem}.txt")
+
+    def scan(self):
+        """Archivos admitidos, nuevos o modificados, que ya no cambian (listos para transcribir)."""
+        now = time.time()
+        allowed = config.get_allowed_extensions()
+        ready = []
+        seen = {}
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.startswith(".") or name.rsplit(".", 1)[-1].lower() not in allowed:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime)
+                seen[path] = signature
+                entry = self.state.get(path)
+                if entry and (entry["size"], entry["mtime"]) == signature:
+                    continue
+                # Igual que en la pasada anterior y sin tocar desde hace settle_seconds
+                stable = self.settle_seconds == 0 or self._seen.get(path) == signature
+                if stable and now - stat.st_mtime >= self.settle_seconds:
+                    ready.append((path, signature))
+        self._seen = seen
+        return ready
+
+    def active_jobs(self):
+        """Actualizar el estado de los trabajos lanzados y devolver cuántos siguen en curso."""
+        active = 0
+        changed = False
+        for entry in self.state.values():
+            if entry.get("status") != "processing":
+                continue
+            status = self.job_status(entry["job_id"]) or "error"
+            if status == "processing":
+                active += 1
+            else:
+                entry["status"] = status
+                changed = True
+        if changed:
+            self._save_state()
+        return active
+
+    def run_once(self):
+        """Una pasada: lanzar los archivos listos hasta WATCH_MAX_ACTIVE trabajos en curso."""
+        active = self.active_jobs()
+        submitted = 0
+        for path, (size, mtime) in self.scan():
+            if active >= self.max_active:
+                break
+            entry = {"size": size, "mtime": mtime, "job_id": None}
+            try:
+                entry["job_id"] = self.submit(path, self._output_path(path))
+                entry["status"] = "processing"
+                entry["output"] = self._output_path(path)
+                active += 1
+                submitted += 1
+                print(f"[MinutaAI] Carpeta vigilada: {path} -> trabajo {entry['job_id']}", flush=True)
+            except Exception as e:
+                # Rechazado (sin audio, dañado...): no se reintenta hasta que el archivo cambie
+                entry["status"] = "error"
+                entry["error"] = str(e)
+                print(f"[MinutaAI] Carpeta vigilada: {path} rechazado: {e}", flush=True)
+            self.state[path] = entry
+            self._save_state()
+        return submitted
+
+    def pending(self):
+        """True si queda algún trabajo en curso o algún archivo sin procesar."""
+        if self.active_jobs() > 0:
+            return True
+        for path, signature in self._seen.items():
+            entry = self.state.get(path)
+            if entry is None or (entry["size"], entry["mtime"]) != signature:
+                return True
+        return False
+
+    def run(self, interval=None, once=False):
+        """Vigilar hasta Ctrl+C. once: procesar lo que hay ahora y salir cuando termine."""
+        interval = config.WATCH_INTERVAL if interval is None else interval
+        while True:
+            self.run_once()
+            if once and not self.pending():
+                return
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carpeta vigilada de MinutaAI")
+    parser.add_argument("folder", nargs="?", default=config.WATCH_FOLDER,
+                        help="Carpeta a vigilar (por defecto WATCH_FOLDER)")
+    parser.add_argument("--output", help="Carpeta de los TXT (por defecto WATCH_OUTPUT_FOLDER o junto al original)")
+    parser.add_argument("--interval", type=float, help="Segundos entre pasadas (por defecto WATCH_INTERVAL)")
+    parser.add_argument("--once", action="store_true",
+                        help="Procesar lo que hay en la carpeta y salir (sin esperar WATCH_SETTLE_SECONDS)")
+    args = parser.parse_args()
+    if not args.folder or not os.path.isdir(args.folder):
+        print("❌ Indica una carpeta existente (argumento o WATCH_FOLDER)")
+        return False
+
+    import app
+    app.setup_server()
+    with app.app.app_context():
+        options, _ = app._job_options({})
+
+    def submit(path, output_path):
+        return app.submit_path(path, options, output_path=output_path, roots=[args.folder])["job_id"]
+
+    def job_status(job_id):
+        job = app.get_job(job_id)
+        return job["status"] if job else None
+
+    watcher = WatchFolder(args.folder, submit, job_status, output_folder=args.output,
+                          settle_seconds=0 if args.once else None)
+    print(f"👀 Vigilando {watcher.folder} (Ctrl+C para detener)")
+    try:
+        watcher.run(args.interval, once=args.once)
+    except KeyboardInterrupt:
+        print("\n👋 Carpeta vigilada detenida")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,69 @@
+"""
+Exportación en ZIP para MinutaAI
+
+Un lote grande se descarga de una vez en lugar de pedir un /download por transcripción. El ZIP
+se genera mientras se envía: zipfile escribe sobre un destino sin seek (cabeceras locales con
+descriptor de datos al final de cada entrada), cada entrada se comprime por bloques y lo
+escrito se entrega en cuanto se acumulan unos KB. No hay archivo temporal y la memoria no
+depende de cuántas transcripciones entren; solo el directorio central (una entrada pequeña por
+archivo) se guarda hasta el final.
+"""
+
+import time
+import zipfile
+
+# Bytes que se acumulan antes de entregarlos al cliente, y tamaño de lectura de los TXT
+BLOCK_SIZE = 64 * 1024
+
+
+class _StreamSink:
+    """Destino de escritura sin seek: guarda lo que escribe zipfile hasta que se recoge."""
+
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self.size = 0
+        return data
+
+
+def file_blocks(path, block_size=BLOCK_SIZE):
+    """Contenido de path en bloques de block_size bytes."""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def stream_zip(entries, block_size=BLOCK_SIZE):
+    """Bytes de un ZIP con entries, a medida que se generan.
+
+    entries: iterable (puede ser perezoso) de (nombre dentro del ZIP, iterable de bytes).
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, blocks in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, "w") as dest:
+                for block in blocks:
+                    dest.write(block)
+                    if sink.size >= block_size:
+                        yield sink.take()
+            if sink.size:
+                yield sink.take()
+    # Directorio central
+    yield sink.take()